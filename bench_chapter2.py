@@ -0,0 +1,479 @@
+# benchmarks for the graph classes in chapter2.py.
+# run all of them with
+#   python bench_chapter2.py
+# or only some of them with
+#   python bench_chapter2.py storage ...
+import os
+import gzip
+import random
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+from array import array
+from collections import deque
+from itertools import chain
+
+from chapter2 import DirectedGraph, UndirectedGraph
+from chapter2 import bfs_tree, bidirectional_bfs, direction_optimizing_bfs
+
+# random 1 origin edge list with n verts and m edges.
+def random_edges(n, m, seed=1):
+     r = random.Random(seed)
+     return [(r.randint(1, n), r.randint(1, n)) for i in range(m)]
+
+# (result, seconds) of f().
+def timed(f, *args, **kwargs):
+     t = time.perf_counter()
+     result = f(*args, **kwargs)
+     return result, time.perf_counter() - t
+
+# (result, bytes still allocated after f() returns) of f().
+def traced_memory(f, *args, **kwargs):
+     tracemalloc.start()
+     before = tracemalloc.get_traced_memory()[0]
+     result = f(*args, **kwargs)
+     after = tracemalloc.get_traced_memory()[0]
+     tracemalloc.stop()
+     return result, after - before
+
+# memory and traversal throughput of list-of-lists vs csr storage.
+def bench_storage(n=100000, m=500000):
+     edges = random_edges(n, m)
+     print("storage: n, m = %d, %d" % (n, m))
+     for cls in (DirectedGraph, UndirectedGraph):
+          for storage in ("list", "csr"):
+               g, size = traced_memory(cls, edges, storage=storage)
+               _, build = timed(cls, edges, storage=storage)
+               _, dfs = timed(g.depth_search_stack)
+               _, bfs = timed(g.breadth_search)
+               print("  %-15s %-4s  %7.1f MB  build %6.2f s"
+                     "  dfs %8.0f edges/s  bfs %8.0f edges/s"
+                     % (cls.__name__, storage, size / 2**20, build,
+                        m / dfs, m / bfs))
+
+# constructor from a list of tuples vs from_array on the same edges.
+def bench_construction(n=200000, m=1000000):
+     edges = random_edges(n, m)
+     flat = array("q", chain.from_iterable(edges))
+     print("construction: n, m = %d, %d" % (n, m))
+     for cls in (DirectedGraph, UndirectedGraph):
+          _, t = timed(cls, edges)
+          print("  %-15s list        %6.2f s" % (cls.__name__, t))
+          _, t = timed(cls, edges, storage="csr")
+          print("  %-15s csr         %6.2f s" % (cls.__name__, t))
+          _, t = timed(cls.from_array, flat)
+          print("  %-15s from_array  %6.2f s" % (cls.__name__, t))
+
+# two level tree with fan-out k, i.e. a BFS frontier of k * k verts.
+def fanout_edges(k):
+     edges = [(1, 1 + i) for i in range(1, k + 1)]
+     for i in range(1, k + 1):
+          edges += [(1 + i, 1 + k * i + j) for j in range(1, k + 1)]
+     return edges
+
+# breadth first labelling with the former list.insert(0, x) queue.
+def list_queue_labels(g):
+     labels = [0] * g.n
+     label = 1
+     for s in range(g.n):
+          if labels[s]:
+               continue
+          labels[s] = label
+          label += 1
+          queue = [s]
+          while queue:
+               v = queue.pop()
+               for e in g.edges_from[v]:
+                    w = g.edges[e][1]
+                    if not labels[w]:
+                         labels[w] = label
+                         label += 1
+                         queue.insert(0, w)
+     return labels
+
+# breadth_search on growing fan-out vs the former list queue.
+def bench_bfs_queue(ks=(50, 100, 200, 400)):
+     print("bfs queue: two level tree with fan-out k")
+     for k in ks:
+          g = DirectedGraph(fanout_edges(k))
+          _, t = timed(g.breadth_search)
+          labels, t0 = timed(list_queue_labels, g)
+          assert(labels == g.labels)
+          print("  k = %4d  n = %7d  deque %6.2f s (%5.2f us/vert)"
+                "  list.insert %6.2f s (%5.2f us/vert)"
+                % (k, g.n, t, 1e6 * t / g.n, t0, 1e6 * t0 / g.n))
+
+# hub v1 with d spokes in both directions, v1 returns to the stack top
+# after every spoke.
+def hub_edges(d):
+     return [(1, i) for i in range(2, d + 2)] + [(i, 1) for i in range(2, d + 2)]
+
+# preorder stack labelling that rescans the top vert's edges from the
+# start each time, as depth_search_from_stack_top did before cursors.
+def rescan_labels(g):
+     labels = [0] * g.n
+     visited_edges = [False] * g.m
+     label = 1
+     for s in range(g.n):
+          if labels[s]:
+               continue
+          labels[s] = label
+          label += 1
+          stack = [s]
+          while stack:
+               v = stack[-1]
+               for e in (e for e in g.edges_from[v] if not visited_edges[e]):
+                    visited_edges[e] = True
+                    w = g.edges[e][1]
+                    if not labels[w]:
+                         labels[w] = label
+                         label += 1
+                         stack.append(w)
+                         break
+               else:
+                    stack.pop()
+     return labels
+
+# depth_search_stack on growing hub degree vs rescanning the edges.
+def bench_dfs_hub(ds=(1000, 4000, 16000)):
+     print("dfs hub: one vert with d out and d in spokes")
+     for d in ds:
+          g = DirectedGraph(hub_edges(d))
+          _, t = timed(g.depth_search_stack)
+          labels, t0 = timed(rescan_labels, g)
+          assert(labels == g.labels)
+          print("  d = %6d  cursor %6.2f s (%5.2f us/edge)"
+                "  rescan %6.2f s (%5.2f us/edge)"
+                % (d, t, 1e6 * t / g.m, t0, 1e6 * t0 / g.m))
+
+# traced stack labelling, i.e. depth_search_stack with debug on but
+# g.debug left off, so only the tracing overhead is measured.
+def traced_depth_search_stack(g):
+     g.init_search_variables()
+     for v in g.unlabeled_vertices():
+          g.push(v)
+          g.depth_search_from_stack_top()
+
+def traced_breadth_search(g):
+     g.init_search_variables()
+     for v in g.unlabeled_vertices():
+          g.put(v)
+          g.breadth_search_from_queue_top()
+
+# cost of a disabled dprint() call formatted eagerly (as the searches
+# did before) and lazily, and per-edge time of the traced search loops
+# with debug off vs the no-trace loops the search methods now pick.
+def bench_trace(n=20000, m=100000):
+     g = DirectedGraph(random_edges(n, m))
+     calls = 100000
+     eager = timeit.timeit(
+          lambda: g.dprint("found non-visited edge e%d with verts"
+                           " (v%d, v%d)" % (1, 2, 3)), number=calls)
+     lazy = timeit.timeit(
+          lambda: g.dprint("found non-visited edge e%d with verts"
+                           " (v%d, v%d)", 1, 2, 3), number=calls)
+     print("trace: n, m = %d, %d" % (n, m))
+     print("  dprint off  eager %5.3f us/call  lazy %5.3f us/call"
+           % (1e6 * eager / calls, 1e6 * lazy / calls))
+     for name, traced, notrace in (
+               ("dfs", traced_depth_search_stack, DirectedGraph.depth_search_stack),
+               ("bfs", traced_breadth_search, DirectedGraph.breadth_search)):
+          labels, t0 = timed(traced, g)
+          labels = list(g.labels)
+          _, t = timed(notrace, g)
+          assert(labels == g.labels)
+          print("  %s  traced %5.2f us/edge  no-trace %5.2f us/edge"
+                % (name, 1e6 * t0 / m, 1e6 * t / m))
+
+# one-sided vs bidirectional BFS on random (s, t) pairs.
+def bench_bidirectional(n=200000, m=1000000, pairs=50):
+     g = DirectedGraph.from_array(array("q", chain.from_iterable(
+          random_edges(n, m))))
+     r = random.Random(2)
+     queries = [(r.randrange(n), r.randrange(n)) for i in range(pairs)]
+     one = [0, 0.0]
+     two = [0, 0.0]
+     for s, t in queries:
+          (parent, dist), t1 = timed(bfs_tree, g, g.edges_from, s, (t,))
+          one[0] += n - dist.count(-1)
+          one[1] += t1
+          (verts, ids, visited), t2 = timed(bidirectional_bfs, g, g.edges_from,
+                                            g.edges_to, s, t)
+          two[0] += visited
+          two[1] += t2
+          assert(len(verts) - 1 == dist[t] or not verts and dist[t] < 0)
+     print("bidirectional: n, m = %d, %d, %d pairs" % (n, m, pairs))
+     for name, (visited, t) in (("one-sided", one), ("bidirectional", two)):
+          print("  %-13s  %9.0f verts visited  %7.2f ms per query"
+                % (name, visited / pairs, 1e3 * t / pairs))
+
+# batch_bfs throughput with growing numbers of worker processes.
+def bench_batch_bfs(n=100000, m=500000, sources=64):
+     g = DirectedGraph.from_array(array("q", chain.from_iterable(
+          random_edges(n, m))))
+     queries = list(range(0, n, n // sources))[:sources]
+     counts = [1]
+     while counts[-1] * 2 <= (os.cpu_count() or 1):
+          counts.append(counts[-1] * 2)
+     print("batch bfs: n, m = %d, %d, %d sources, %d cpus"
+           % (n, m, len(queries), os.cpu_count() or 1))
+     base = None
+     for processes in counts:
+          _, t = timed(g.batch_bfs, queries, processes=processes)
+          base = base or t
+          print("  %3d processes  %6.2f s  %6.1f sources/s  speedup %4.2f"
+                % (processes, t, len(queries) / t, base / t))
+
+# (result, peak bytes allocated while f() runs) of f().
+def peak_memory(f, *args, **kwargs):
+     tracemalloc.start()
+     result = f(*args, **kwargs)
+     peak = tracemalloc.get_traced_memory()[1]
+     tracemalloc.stop()
+     return result, peak
+
+# edge list parsed into tuples for the constructor, as callers had to.
+def list_from_file(cls, path):
+     with open(path) as f:
+          return cls([tuple(map(int, line.split())) for line in f])
+
+# from_file on text and gzip files vs building a list of tuples first.
+def bench_read(n=200000, m=1000000):
+     print("read: n, m = %d, %d" % (n, m))
+     with tempfile.TemporaryDirectory() as tmp:
+          path = os.path.join(tmp, "g.txt")
+          text = "".join("%d %d\n" % e for e in random_edges(n, m))
+          with open(path, "w") as f:
+               f.write(text)
+          with gzip.open(path + ".gz", "wt") as f:
+               f.write(text)
+          del text
+          # tracemalloc slows the parsing, so time and peak are measured
+          # in separate runs.
+          for cls in (DirectedGraph, UndirectedGraph):
+               _, t = timed(list_from_file, cls, path)
+               _, peak = peak_memory(list_from_file, cls, path)
+               print("  %-15s tuples     %6.2f s  peak %7.1f MB"
+                     % (cls.__name__, t, peak / 2**20))
+               for name in (path, path + ".gz"):
+                    _, t = timed(cls.from_file, name)
+                    _, peak = peak_memory(cls.from_file, name)
+                    print("  %-15s from_file  %6.2f s  peak %7.1f MB  (%s)"
+                          % (cls.__name__, t, peak / 2**20,
+                             os.path.basename(name)))
+
+# construction from tuples and from_array vs load of a saved graph,
+# and the first search on the loaded graph, which faults the pages in.
+def bench_file(n=200000, m=1000000):
+     edges = random_edges(n, m)
+     print("file: n, m = %d, %d" % (n, m))
+     with tempfile.TemporaryDirectory() as tmp:
+          path = os.path.join(tmp, "g.graph")
+          for cls in (DirectedGraph, UndirectedGraph):
+               g, build = timed(cls, edges)
+               flat = array("q", chain.from_iterable(edges))
+               _, bulk = timed(cls.from_array, flat)
+               _, save = timed(g.save, path)
+               h, load = timed(cls.load, path)
+               _, bfs = timed(h.breadth_search)
+               print("  %-15s build %6.2f s  from_array %6.2f s  save %6.2f s"
+                     "  load %8.5f s  first bfs %6.2f s  %6.1f MB"
+                     % (cls.__name__, build, bulk, save, load, bfs,
+                        os.path.getsize(path) / 2**20))
+
+# conversion between the two classes vs building the target from the
+# edge list again, in both storages.
+def bench_convert(n=500000, m=2000000):
+     edges = random_edges(n, m)
+     arcs = list(chain(*(((u, v), (v, u)) for u, v in edges)))
+     print("convert: n, m = %d, %d" % (n, m))
+     for storage in ("csr", "list"):
+          for src, dst, rebuild in ((DirectedGraph, UndirectedGraph, edges),
+                                    (UndirectedGraph, DirectedGraph, arcs)):
+               g = src(edges, storage=storage)
+               _, t = timed(dst, g, storage=storage)
+               _, t0 = timed(dst, rebuild, storage=storage)
+               print("  %-4s  %-15s -> %-15s  convert %6.2f s  rebuild %6.2f s"
+                     % (storage, src.__name__, dst.__name__, t, t0))
+               del g
+
+# breadth first labelling finding the opposite end point of each edge
+# by unpacking edges[e] (the former no-trace loops) or by
+# order_v_first (the former traced loops).
+def unpack_labels(g):
+     edges, labels, label = g.edges, [0] * g.n, 1
+     for s in range(g.n):
+          if labels[s]:
+               continue
+          labels[s] = label
+          label += 1
+          queue = deque([s])
+          while queue:
+               v = queue.popleft()
+               for e in g.edges_at[v]:
+                    x, y = edges[e]
+                    w = x + y - v
+                    if not labels[w]:
+                         labels[w] = label
+                         label += 1
+                         queue.append(w)
+     return labels
+
+def order_v_first_labels(g):
+     labels, label = [0] * g.n, 1
+     for s in range(g.n):
+          if labels[s]:
+               continue
+          labels[s] = label
+          label += 1
+          queue = deque([s])
+          while queue:
+               v = queue.popleft()
+               for e in g.edges_at[v]:
+                    v, w = g.order_v_first(v, e)
+                    if not labels[w]:
+                         labels[w] = label
+                         label += 1
+                         queue.append(w)
+     return labels
+
+# edges/s of the undirected searches with the other_end table, and of
+# breadth first labelling with the former end point lookups.
+def bench_other_end(n=200000, m=1000000):
+     edges = random_edges(n, m)
+     print("other_end: n, m = %d, %d" % (n, m))
+     for storage in ("list", "csr"):
+          g = UndirectedGraph(edges, storage=storage)
+          _, dfs = timed(g.depth_search_stack)
+          _, traced = timed(traced_depth_search_stack, g)
+          _, bfs = timed(g.breadth_search)
+          labels = list(g.labels)
+          for name, f in (("unpack", unpack_labels),
+                          ("order_v_first", order_v_first_labels)):
+               result, t = timed(f, g)
+               assert(result == labels)
+               print("  %-4s  bfs %-13s %9.0f edges/s"
+                     % (storage, name, m / t))
+          print("  %-4s  bfs other_end     %9.0f edges/s  dfs %9.0f edges/s"
+                "  traced dfs %9.0f edges/s"
+                % (storage, m / bfs, m / dfs, m / traced))
+
+# dijkstra with the heap vs the bucket queue, over the whole graph and
+# for single (s, t) pairs, with small and larger integer weights.
+def bench_dijkstra(n=200000, m=1000000, pairs=20):
+     edges = random_edges(n, m)
+     r = random.Random(3)
+     queries = [(r.randrange(n), r.randrange(n)) for i in range(pairs)]
+     print("dijkstra: n, m = %d, %d, %d pairs" % (n, m, pairs))
+     for max_weight in (10, 1000):
+          g = DirectedGraph.from_array(array("q", chain.from_iterable(edges)))
+          g.set_weights([r.randint(1, max_weight) for i in range(m)])
+          for bucket in (False, True):
+               (dist, parent), t = timed(g.dijkstra, 0, bucket=bucket)
+               t1 = 0.0
+               for s, u in queries:
+                    _, t2 = timed(g.dijkstra, s, u, bucket)
+                    t1 += t2
+               print("  weights 1..%-4d  %-6s  all %6.2f s  pair %7.2f ms"
+                     % (max_weight, "bucket" if bucket else "heap", t,
+                        1e3 * t1 / pairs))
+
+# edges examined per level by the direction optimizing BFS vs the out
+# edges of every frontier a top-down BFS expands, on a low diameter
+# random graph.
+def bench_direction(n=200000, m=2000000):
+     g = DirectedGraph.from_array(array("q", chain.from_iterable(
+          random_edges(n, m))))
+     stats = []
+     (parent, dist), t = timed(direction_optimizing_bfs, g, g.edges_from,
+                               g.edges_to, 0, stats=stats)
+     (parent0, dist0), t0 = timed(bfs_tree, g, g.edges_from, 0)
+     assert(dist == dist0)
+     print("direction: n, m = %d, %d" % (n, m))
+     total, total0 = 0, 0
+     for level, mode, size, examined in stats:
+          top_down = sum(len(g.edges_from[v]) for v in range(n)
+                         if dist[v] == level)
+          total += examined
+          total0 += top_down
+          print("  level %2d  %-9s  frontier %7d  examined %8d"
+                "  top-down %8d" % (level, mode, size, examined, top_down))
+     print("  total edges examined %d vs %d, %.2f s vs %.2f s"
+           % (total, total0, t, t0))
+
+# repeated find_shortest_path/find_path queries from a few hot sources
+# with and without the search tree cache.
+def bench_cache(n=100000, m=500000, sources=8, queries=200):
+     edges = random_edges(n, m)
+     r = random.Random(4)
+     hot = [r.randrange(n) for i in range(sources)]
+     pairs = [(r.choice(hot), r.randrange(n)) for i in range(queries)]
+     print("cache: n, m = %d, %d, %d queries from %d sources"
+           % (n, m, queries, sources))
+     for name in ("find_shortest_path", "find_path"):
+          g = DirectedGraph(edges)
+          _, t0 = timed(lambda: [getattr(g, name)(s, t) for s, t in pairs])
+          g.enable_cache()
+          _, t = timed(lambda: [getattr(g, name)(s, t) for s, t in pairs])
+          print("  %-18s  uncached %6.2f ms/query  cached %6.2f ms/query  %s"
+                % (name, 1e3 * t0 / queries, 1e3 * t / queries,
+                   g.cache.stats()))
+
+# reachability index build time and size, and reachable() lookups vs
+# a BFS per query, on graphs with more and fewer components.
+def bench_reach(n=100000, ms=(150000, 500000), queries=200):
+     r = random.Random(5)
+     pairs = [(r.randrange(n), r.randrange(n)) for i in range(queries)]
+     print("reach: n = %d, %d queries" % (n, queries))
+     for m in ms:
+          g = DirectedGraph.from_array(array("q", chain.from_iterable(
+               random_edges(n, m))))
+          index = g.reachability()
+          answers, t = timed(lambda: [g.reachable(s, u) for s, u in pairs])
+          searched, t0 = timed(lambda: [bfs_tree(g, g.edges_from, s, (u,))[1][u]
+                                        >= 0 for s, u in pairs])
+          assert(answers == searched)
+          _, tp = timed(lambda: [g.find_guided_path(s, u) for s, u in pairs])
+          print("  m = %7d  %6d components  build %6.2f s  %7.1f MB"
+                "  reachable %6.2f us  bfs %7.2f ms  guided path %6.2f ms"
+                % (m, len(index.reach), index.build_seconds,
+                   index.nbytes / 2**20, 1e6 * t / queries,
+                   1e3 * t0 / queries, 1e3 * tp / queries))
+
+# biconnected components of sparse random undirected graphs, in edges/s
+# of the lowpoint search against a plain depth_search_stack.
+def bench_biconnected(n=500000, ms=(600000, 2000000)):
+     print("biconnected: n = %d" % n)
+     for m in ms:
+          g = UndirectedGraph.from_array(array("q", chain.from_iterable(
+               random_edges(n, m))))
+          (cut, bridge, block), t = timed(g.biconnected_components)
+          _, t0 = timed(g.depth_search_stack)
+          print("  m = %7d  %7d blocks  %7d cut verts  %7d bridges"
+                "  %9.0f edges/s  (dfs %9.0f edges/s)"
+                % (m, g.blocks, cut.count(1), bridge.count(1), m / t, m / t0))
+
+benchmarks = {
+     "storage": bench_storage,
+     "construction": bench_construction,
+     "bfs_queue": bench_bfs_queue,
+     "dfs_hub": bench_dfs_hub,
+     "trace": bench_trace,
+     "bidirectional": bench_bidirectional,
+     "batch_bfs": bench_batch_bfs,
+     "file": bench_file,
+     "read": bench_read,
+     "convert": bench_convert,
+     "other_end": bench_other_end,
+     "dijkstra": bench_dijkstra,
+     "direction": bench_direction,
+     "cache": bench_cache,
+     "reach": bench_reach,
+     "biconnected": bench_biconnected,
+}
+
+if __name__ == '__main__':
+     for name in sys.argv[1:] or benchmarks:
+          benchmarks[name]()
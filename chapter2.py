@@ -7,6 +7,27 @@
 # when values >= 0 are given, m must be len(edges).
 # there is no possible check for n based only on edges data.
 import copy
+import gzip
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+from collections import OrderedDict, deque
+from heapq import heappop, heappush
+from multiprocessing import Pool, shared_memory
+from threading import Lock, get_ident
+from array import array
+from bisect import bisect_left
+from itertools import chain, islice, repeat, starmap
+from operator import gt, index, lt, ne, rshift, sub, xor
+# numpy is optional. when it is installed, the array-backed storage is
+# built with vectorized sort/bincount instead of builtin sorted().
+try:
+     import numpy
+except ImportError:
+     numpy = None
 
 def check_nm(edges, n, m):
      m1 = len(edges)
@@ -28,6 +49,9 @@ def add(a, l):
         return [add(a, elem) for elem in l]
     elif type(l) == tuple:
         return tuple(add(a, elem) for elem in l)
+    # tombstone of a removed edge.
+    elif l is None:
+        return l
     else:
         raise ValueError("unkown data type to apply add()")
 
@@ -36,14 +60,1470 @@ def add(a, l):
 def str_stack(a):
      return "[" + ", ".join(["v"+str(v) for v in reversed(add(1, a))]) + "]"
 
+# print queue in the same manner as str_stack, the next vert to be
+# dequeued coming first.
+def str_queue(q):
+     return "[" + ", ".join(["v"+str(v + 1) for v in q]) + "]"
+
+# list form of edges/incidence data, whichever storage holds it.
+def as_list(a):
+     if type(a) == list:
+          return a
+     return a.tolist()
+
+# smallest array typecode able to hold integers in [0, bound).
+def int_typecode(bound):
+     if bound < 2**31:
+          return "i"
+     return "q"
+
+# array-backed storage (storage="csr").
+# edges are kept as one flat array (u0, v0, u1, v1, ...) of 0 origin
+# verts, and every incidence list as a compressed sparse row index:
+# offsets[v]:offsets[v + 1] is the slice of ids (edge ids) and nbrs
+# (opposite end points) belonging to v. ids within a vertex keep the
+# increasing order of the list-of-lists layout, so searches visit the
+# edges in exactly the same order in both storages.
+class EdgeArray:
+     def __init__(self, flat):
+          self.flat = flat
+          view = memoryview(flat)
+          self.tails = view[0::2]
+          self.heads = view[1::2]
+
+     def __len__(self):
+          return len(self.flat) // 2
+
+     def __getitem__(self, e):
+          return self.flat[2 * e], self.flat[2 * e + 1]
+
+     def __iter__(self):
+          return zip(self.tails, self.heads)
+
+     def tolist(self):
+          return list(self)
+
+class CSRIndex:
+     def __init__(self, offsets, ids, nbrs):
+          self.offsets = offsets
+          self.ids = ids
+          self.nbrs = nbrs
+          self.ids_view = memoryview(ids)
+          self.nbrs_view = memoryview(nbrs)
+
+     def __len__(self):
+          return len(self.offsets) - 1
+
+     # edge ids incident to v, as a zero-copy view.
+     def __getitem__(self, v):
+          return self.ids_view[self.offsets[v]:self.offsets[v + 1]]
+
+     def __iter__(self):
+          for v in range(len(self)):
+               yield self[v]
+
+     def neighbors(self, v):
+          return self.nbrs_view[self.offsets[v]:self.offsets[v + 1]]
+
+     def tolist(self):
+          return [list(ids) for ids in self]
+
+# other_end[e] = u ^ v for every edge e = (u, v) of a list of pairs or
+# an EdgeArray, so the opposite end point of e at either of its end
+# points v is v ^ other_end[e], a single array read. tc must be able to
+# hold 2n.
+def other_ends(edges, tc):
+     if type(edges) == EdgeArray:
+          if numpy is not None:
+               ends = numpy.asarray(edges.tails) ^ numpy.asarray(edges.heads)
+               return array(tc, ends.astype(tc).tobytes())
+          return array(tc, map(xor, edges.tails, edges.heads))
+     return array(tc, starmap(xor, edges))
+
+# flat 0 origin edge array from a sequence of pairs given in origin
+# `origin`. tc must be able to hold every vertex number.
+def flat_edges(edges, tc, origin=0):
+     flat = array(tc, chain.from_iterable(edges))
+     if origin:
+          flat = array(tc, map(sub, flat, repeat(origin)))
+     return flat
+
+# integer array holding the items of an (m, 2) or flat buffer of
+# verts (numpy arrays, array.array, memoryview, bytes of a typed
+# buffer ...), or of a sequence of pairs when data has no buffer.
+def int_array(data):
+     if type(data) == array:
+          return data
+     try:
+          view = memoryview(data)
+     except TypeError:
+          return array("q", chain.from_iterable(data))
+     if view.ndim == 2 and not view.shape[1] == 2:
+          raise ValueError("edge array must have shape (m, 2)")
+     if view.ndim > 2:
+          raise ValueError("edge array must have shape (m, 2)")
+     fmt = view.format.lstrip("@=<>!")
+     order = view.format[:len(view.format) - len(fmt)]
+     if not fmt in "bBhHiIlLqQ" or not len(fmt) == 1 or len(order) > 1:
+          raise ValueError("edge array must hold integers, not %s"
+                           % view.format)
+     # standard sizes ("<l" is 4 bytes) can differ from the native size
+     # of the same code, so take the native code of the item size.
+     codes = "bhilq" if fmt.islower() else "BHILQ"
+     fmt = [c for c in codes if array(c).itemsize == view.itemsize][0]
+     raw = array(fmt)
+     if not view.nbytes:
+          return raw
+     # a strided buffer (a slice, fortran order) is copied into C order.
+     raw.frombytes(view.cast("B") if view.c_contiguous else view.tobytes())
+     if order in ("<", ">", "!") and \
+        not (order == "<") == (sys.byteorder == "little"):
+          raw.byteswap()
+     return raw
+
+# check_nm for a flat edge array (u0, v0, u1, v1, ...) in origin
+# `origin`. min/max run over the array in C, and unlike check_nm a
+# given n is checked against the largest vertex.
+def check_nm_flat(flat, n, m, origin=0):
+     if len(flat) % 2:
+          raise ValueError("edge array must hold pairs of verts")
+     m1 = len(flat) // 2
+     n1 = 0
+     if m1:
+          if numpy is not None:
+               a = numpy.asarray(flat)
+               lo, hi = int(a.min()), int(a.max())
+          else:
+               lo, hi = min(flat), max(flat)
+          if lo < origin:
+               raise ValueError("edge array has a vertex below origin %d"
+                                % origin)
+          n1 = hi - origin + 1
+     if m < 0:
+          m = m1
+     elif not m == m1:
+          raise ValueError("number of edges does not match with given m")
+     if n < 0:
+          n = n1
+     elif n < n1:
+          raise ValueError("edge array has vertex %d beyond n = %d"
+                           % (n1 - 1 + origin, n))
+     return n, m
+
+# array of op(x, k) for x in a, e.g. op=sub shifts the origin.
+def map_array(op, a, k, tc):
+     if numpy is not None:
+          return array(tc, op(numpy.asarray(a), k).astype(tc).tobytes())
+     return array(tc, map(op, a, repeat(k)))
+
+# flat 0 origin copy of a checked edge array in typecode tc.
+def shift_array(raw, tc, origin):
+     if origin:
+          return map_array(sub, raw, origin, tc)
+     if raw.typecode == tc:
+          return raw
+     return array(tc, raw)
+
+# sort incidences by the vertex they belong to. keys[j] is the vertex of
+# the j-th incidence. the sort is stable, so incidences of the same
+# vertex keep their relative order. returns (order, offsets).
+def csr_order(n, keys, tc):
+     if numpy is not None:
+          k = numpy.asarray(keys)
+          order = numpy.argsort(k, kind="stable").astype(tc)
+          offsets = numpy.zeros(n + 1, tc)
+          numpy.cumsum(numpy.bincount(k, minlength=n), out=offsets[1:])
+          return array(tc, order.tobytes()), array(tc, offsets.tobytes())
+     order = array(tc, sorted(range(len(keys)), key=keys.__getitem__))
+     sorted_keys = array(tc, map(keys.__getitem__, order))
+     offsets = array(tc, map(bisect_left, repeat(sorted_keys), range(n + 1)))
+     return order, offsets
+
+# array of values[i] for i in index.
+def gather(values, index, tc):
+     if numpy is not None:
+          a = numpy.asarray(values)[numpy.asarray(index)]
+          return array(tc, a.astype(tc).tobytes())
+     return array(tc, map(values.__getitem__, index))
+
+# flat arc array of the symmetric digraph of a flat undirected edge
+# array: edge i = (u, v) becomes arcs 2i = (u, v) and 2i + 1 = (v, u).
+def symmetric_arcs(flat, tc):
+     if not (type(flat) == array and flat.typecode == tc):
+          flat = array(tc, flat)
+     arcs = array(tc, [0]) * (2 * len(flat))
+     arcs[0::4] = arcs[3::4] = flat[0::2]
+     arcs[1::4] = arcs[2::4] = flat[1::2]
+     return arcs
+
+# ids of the arcs entering each vert of the symmetric digraph of flat,
+# given the ids `order` of the arcs leaving it and their heads nbrs.
+# arc j ^ 1 is the reverse of arc j, except for loops, whose two arcs
+# both leave and enter v and keep their ids.
+def reverse_arcs(order, flat, nbrs, tc):
+     if numpy is not None:
+          o, f = numpy.asarray(order), numpy.asarray(flat)
+          ids = o ^ (f[o] != numpy.asarray(nbrs))
+          return array(tc, ids.astype(tc).tobytes())
+     return array(tc, map(xor, order,
+                          map(ne, map(flat.__getitem__, order), nbrs)))
+
+# edges of one block of an edge list file as a flat "q" array, two
+# integers per edge line. lines are split on whitespace; lines
+# starting with comments are skipped and so is one non-numeric line
+# when allow_header is set and no edge came before it (csv header).
+# columns after the second are ignored. blocks made only of lines of
+# exactly two integers, checked by one regular expression match, are
+# converted in a single split.
+edge_line = rb"[ \t]*[+-]?\d+[ \t]+[+-]?\d+[ \t]*"
+two_column_block = re.compile(rb"(?:%s\r?\n)*(?:%s)?" % (edge_line, edge_line))
+
+def parse_edge_block(block, comments, allow_header):
+     if two_column_block.fullmatch(block):
+          return array("q", map(int, block.split()))
+     flat = array("q")
+     for line in block.splitlines():
+          cols = line.split()
+          if not cols or comments and cols[0].startswith(comments):
+               continue
+          try:
+               u, v = int(cols[0]), int(cols[1])
+          except (ValueError, IndexError):
+               if allow_header and not flat:
+                    allow_header = False
+                    continue
+               raise ValueError("not an edge line: %r" % line.decode())
+          flat.append(u)
+          flat.append(v)
+     return flat
+
+# flat 0 origin edge array read from an edge list file with one edge
+# "u v" per line in origin `origin`. columns are split on whitespace,
+# or on delimiter (e.g. "," for csv), and files starting with the gzip
+# magic are decompressed. the file is parsed chunk_size bytes at a
+# time straight into an "i" array, widened to "q" only once a vertex or
+# edge count needs it, so no python object per edge is kept and the
+# peak memory stays near the size of the edge array. returns (flat, n)
+# with n guessed from the largest vertex as check_nm does.
+def read_edge_file(path, origin=1, delimiter=None, comments="#",
+                   chunk_size=1 << 22):
+     with open(path, "rb") as f:
+          compressed = f.read(2) == b"\x1f\x8b"
+     comments = comments.encode() if comments else b""
+     flat = array("i")
+     hi = origin - 1
+     with (gzip.open if compressed else open)(path, "rb") as f:
+          while True:
+               block = f.read(chunk_size)
+               if not block:
+                    break
+               block += f.readline()
+               if delimiter:
+                    block = block.replace(delimiter.encode(), b" ")
+               chunk = parse_edge_block(block, comments, not flat)
+               if not chunk:
+                    continue
+               if min(chunk) < origin:
+                    raise ValueError("%s has a vertex below origin %d"
+                                     % (path, origin))
+               hi = max(hi, max(chunk))
+               tc = int_typecode(max(hi - origin + 1,
+                                     len(flat) + len(chunk)) + 1)
+               if not flat.typecode == tc:
+                    flat = array(tc, flat)
+               flat.extend(map_array(sub, chunk, origin, tc))
+     return flat, hi - origin + 1
+
+# binary graph file, written by save() and mapped by load():
+# a header (magic, format version, kind b"U"/b"D", typecode and byte
+# order of the arrays, n, m) followed by the flat 0 origin edge array,
+# the other_end table and the offsets, ids and nbrs arrays of every
+# incidence index of the graph (edges_at, or edges_from then edges_to),
+# each in the typecode of the header and starting on an 8 byte boundary.
+graph_file_magic = b"GRAPHNET"
+graph_file_version = 2
+graph_file_header = struct.Struct("=8sIccc9xQQ")
+
+# the file is written under a temporary name in the same directory and
+# renamed onto path, so graphs still mapping an older file at path (the
+# arrays may even come from it) keep reading the old one.
+def write_graph_file(path, kind, n, m, arrays):
+     tc = int_typecode(max(2 * n, 2 * m) + 1)
+     order = b"<" if sys.byteorder == "little" else b">"
+     tmp = "%s.%d.%d.tmp" % (path, os.getpid(), get_ident())
+     try:
+          with open(tmp, "wb") as f:
+               f.write(graph_file_header.pack(graph_file_magic,
+                                              graph_file_version, kind,
+                                              tc.encode(), order, n, m))
+               for a in arrays:
+                    if not memoryview(a).format == tc:
+                         a = array(tc, a)
+                    f.write(bytes(-f.tell() % 8))
+                    f.write(memoryview(a))
+          os.replace(tmp, path)
+     except BaseException:
+          if os.path.exists(tmp):
+               os.unlink(tmp)
+          raise
+
+# (kind, n, m, arrays) of a graph file. the arrays are read-only
+# memoryviews into a private mapping of the file, so nothing is read
+# or copied until the pages are touched, and processes mapping the
+# same file share its pages in the os cache.
+def map_graph_file(path):
+     with open(path, "rb") as f:
+          mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+     view = memoryview(mapped)
+     if len(view) < graph_file_header.size:
+          raise ValueError("%s is not a graph file" % path)
+     magic, version, kind, tc, order, n, m = graph_file_header.unpack(
+          view[:graph_file_header.size])
+     if not magic == graph_file_magic:
+          raise ValueError("%s is not a graph file" % path)
+     if not version == graph_file_version:
+          raise ValueError("%s has unsupported format version %d"
+                           % (path, version))
+     if not order == (b"<" if sys.byteorder == "little" else b">"):
+          raise ValueError("%s was written with the other byte order" % path)
+     tc = tc.decode()
+     if not tc in ("i", "q") or not kind in (b"U", b"D"):
+          raise ValueError("%s has a broken header" % path)
+     if kind == b"U":
+          lengths = (2 * m, m, n + 1, 2 * m, 2 * m)
+     else:
+          lengths = (2 * m, m, n + 1, m, m, n + 1, m, m)
+     itemsize = array(tc).itemsize
+     arrays = []
+     pos = graph_file_header.size
+     for k in lengths:
+          pos += -pos % 8
+          if pos + k * itemsize > len(view):
+               raise ValueError("%s is truncated" % path)
+          arrays.append(view[pos:pos + k * itemsize].cast(tc))
+          pos += k * itemsize
+     return kind, n, m, arrays
+
+# search loops without tracing. the search methods run these instead of
+# push()/pop()/put()/get() when debug is off; they label the verts
+# reachable from s exactly like the traced loops and update the
+# search variables of g in the same way. adj is the incidence index to
+# follow (edges_at, edges_from, ...). the opposite end point of edge e
+# at v is v ^ other_end[e], whatever the direction.
+def dfs_stack_notrace(g, adj, s, postorder=False):
+     other_end, labels, cursor = g.other_end, g.labels, g.cursor
+     visited_vertices, visited_edges = g.visited_vertices, g.visited_edges
+     label = g.label
+     visited_vertices[s] = True
+     if not postorder:
+          labels[s] = label
+          label += 1
+     stack = [s]
+     while stack:
+          v = stack[-1]
+          ids = adj[v]
+          i = cursor[v]
+          k = len(ids)
+          while i < k:
+               e = ids[i]
+               i += 1
+               if visited_edges[e]:
+                    continue
+               visited_edges[e] = True
+               w = v ^ other_end[e]
+               if not visited_vertices[w]:
+                    visited_vertices[w] = True
+                    if not postorder:
+                         labels[w] = label
+                         label += 1
+                    stack.append(w)
+                    break
+          else:
+               stack.pop()
+               if postorder:
+                    labels[v] = label
+                    label += 1
+          cursor[v] = i
+     g.label = label
+
+def bfs_notrace(g, adj, s):
+     other_end, labels = g.other_end, g.labels
+     visited_vertices, visited_edges = g.visited_vertices, g.visited_edges
+     label = g.label
+     visited_vertices[s] = True
+     labels[s] = label
+     label += 1
+     queue = deque([s])
+     while queue:
+          v = queue.popleft()
+          for e in adj[v]:
+               if visited_edges[e]:
+                    continue
+               visited_edges[e] = True
+               w = v ^ other_end[e]
+               if not visited_vertices[w]:
+                    visited_vertices[w] = True
+                    labels[w] = label
+                    label += 1
+                    queue.append(w)
+     g.label = label
+
+# closed paths closed by the back edges of a depth first search over
+# adj, yielded lazily as lists of verts [w, ..., w]. with the stack
+# position of every vert at hand, cutting a closed path out of the
+# stack costs only its length. the search stops when the consumer does.
+def dfs_cycles(g, adj):
+     other_end = g.other_end
+     visited_vertices = bytearray(g.n)
+     visited_edges = bytearray(g.removed_edges)
+     cursor = [0] * g.n
+     stack_pos = [-1] * g.n
+     for s in range(g.n):
+          if visited_vertices[s]:
+               continue
+          visited_vertices[s] = True
+          stack_pos[s] = 0
+          stack = [s]
+          while stack:
+               v = stack[-1]
+               ids = adj[v]
+               i = cursor[v]
+               k = len(ids)
+               while i < k:
+                    e = ids[i]
+                    i += 1
+                    if visited_edges[e]:
+                         continue
+                    visited_edges[e] = True
+                    w = v ^ other_end[e]
+                    if not visited_vertices[w]:
+                         visited_vertices[w] = True
+                         stack_pos[w] = len(stack)
+                         stack.append(w)
+                         break
+                    if stack_pos[w] >= 0:
+                         loop = stack[stack_pos[w]:]
+                         loop.append(w)
+                         yield loop
+               else:
+                    stack_pos[stack.pop()] = -1
+               cursor[v] = i
+
+# closed path in the format of print_loops, in origin 1.
+def loop_str(loop):
+     return "<" + " -> ".join(map(str, add(1, loop))) + ">"
+
+# raised by topological_order when the graph has a closed path. cycle
+# is the closed path met, as a list of verts [w, ..., w].
+class CycleError(ValueError):
+     def __init__(self, cycle):
+          super().__init__("graph has a closed path %s" % loop_str(cycle))
+          self.cycle = cycle
+
+# verts of g in topological order over adj: the reverse of the
+# postorder of an iterative depth first search started from every
+# unvisited vert in increasing order. an edge to a vert still on the
+# stack is a back edge, reported as CycleError with the closed path.
+def topological_order(g, adj):
+     other_end, removed_edges = g.other_end, g.removed_edges
+     visited = bytearray(g.n)
+     cursor = [0] * g.n
+     stack_pos = [-1] * g.n
+     postorder = array(int_typecode(g.n + 1))
+     for s in range(g.n):
+          if visited[s]:
+               continue
+          visited[s] = True
+          stack_pos[s] = 0
+          stack = [s]
+          while stack:
+               v = stack[-1]
+               ids = adj[v]
+               i = cursor[v]
+               k = len(ids)
+               while i < k:
+                    e = ids[i]
+                    i += 1
+                    if removed_edges[e]:
+                         continue
+                    w = v ^ other_end[e]
+                    if not visited[w]:
+                         visited[w] = True
+                         stack_pos[w] = len(stack)
+                         stack.append(w)
+                         break
+                    if stack_pos[w] >= 0:
+                         raise CycleError(stack[stack_pos[w]:] + [w])
+               else:
+                    stack_pos[stack.pop()] = -1
+                    postorder.append(v)
+               cursor[v] = i
+     postorder.reverse()
+     return postorder
+
+# shortest (or longest) paths from s in a DAG, relaxing the edges of
+# adj of every vert in topological order once. weights[e] is the
+# length of edge e, 1 for every edge when weights is None. returns
+# (dist, parent): dist[v] is the path length, None for verts not
+# reached, and parent[v] the id of the last edge of the path, -1 for s
+# and for verts not reached.
+def dag_paths(g, adj, order, s, weights=None, longest=False):
+     other_end, removed_edges = g.other_end, g.removed_edges
+     better = gt if longest else lt
+     dist = [None] * g.n
+     parent = array(int_typecode(max(g.n, g.m) + 1), [-1]) * g.n
+     dist[s] = 0
+     for v in islice(order, order.index(s), None):
+          d = dist[v]
+          if d is None:
+               continue
+          for e in adj[v]:
+               if removed_edges[e]:
+                    continue
+               w = v ^ other_end[e]
+               x = d + (1 if weights is None else weights[e])
+               if dist[w] is None or better(x, dist[w]):
+                    dist[w] = x
+                    parent[w] = e
+     return dist, parent
+
+# breadth first search tree from s over adj. parent[v] is the id of the
+# edge through which v was first reached and dist[v] its number of
+# edges from s, both -1 for s's parent and for verts not reached. the
+# frontier is a flat array consumed from a head index. when targets
+# is given, the search stops as soon as all of them are dequeued.
+def bfs_tree(g, adj, s, targets=None):
+     other_end, removed_edges = g.other_end, g.removed_edges
+     tc = int_typecode(max(g.n, g.m) + 1)
+     parent = array(tc, [-1]) * g.n
+     dist = array(tc, [-1]) * g.n
+     dist[s] = 0
+     remaining = set(targets) if targets is not None else None
+     queue = array(tc, [s])
+     head = 0
+     while head < len(queue):
+          v = queue[head]
+          head += 1
+          if remaining is not None:
+               remaining.discard(v)
+               if not remaining:
+                    break
+          d = dist[v] + 1
+          for e in adj[v]:
+               if removed_edges[e]:
+                    continue
+               w = v ^ other_end[e]
+               if dist[w] < 0:
+                    dist[w] = d
+                    parent[w] = e
+                    queue.append(w)
+     return parent, dist
+
+# depth first search tree from s over adj, as an array of parent edge
+# ids like the one of bfs_tree. verts are reached in the order of the
+# cursor based stack searches, so the tree path s -> t is the stack
+# find_path returns when it reaches t.
+def dfs_tree(g, adj, s):
+     other_end, removed_edges = g.other_end, g.removed_edges
+     parent = array(int_typecode(max(g.n, g.m) + 1), [-1]) * g.n
+     visited = bytearray(g.n)
+     visited[s] = True
+     verts, cursors = [s], [0]
+     while verts:
+          v = verts[-1]
+          ids = adj[v]
+          i = cursors[-1]
+          k = len(ids)
+          while i < k:
+               e = ids[i]
+               i += 1
+               if removed_edges[e]:
+                    continue
+               w = v ^ other_end[e]
+               if not visited[w]:
+                    visited[w] = True
+                    parent[w] = e
+                    cursors[-1] = i
+                    verts.append(w)
+                    cursors.append(0)
+                    break
+          else:
+               verts.pop()
+               cursors.pop()
+     return parent
+
+# biconnected components of an undirected graph by one iterative
+# lowpoint depth first search over adj (hopcroft and tarjan). disc[v]
+# is the preorder number of v and low[v] the smallest one reachable
+# from v's subtree through one back edge. edges are marked used when
+# first examined, so the tree edge to a vert's parent is skipped by id
+# and a parallel edge to the parent counts as a back edge. the edges
+# are stacked as examined and a block is popped off whenever a child v
+# of u has low[v] >= disc[u]. returns (cut, bridge, block): a bytearray
+# flagging articulation verts, a bytearray flagging bridges and the
+# block id of every edge (-1 for removed edges). a loop is a block of
+# its own.
+def biconnected_components(g, adj):
+     other_end = g.other_end
+     tc = int_typecode(max(g.n, g.m) + 1)
+     disc = array(tc, [-1]) * g.n
+     low = array(tc, [0]) * g.n
+     cut = bytearray(g.n)
+     bridge = bytearray(g.m)
+     block = array(tc, [-1]) * g.m
+     used = bytearray(g.removed_edges)
+     edge_stack = []
+     number = 0
+     count = 0
+     for r in range(g.n):
+          if disc[r] >= 0:
+               continue
+          disc[r] = low[r] = number
+          number += 1
+          children = 0
+          verts, cursors, via = [r], [0], [-1]
+          while verts:
+               v = verts[-1]
+               ids = adj[v]
+               i = cursors[-1]
+               k = len(ids)
+               while i < k:
+                    e = ids[i]
+                    i += 1
+                    if used[e]:
+                         continue
+                    used[e] = True
+                    w = v ^ other_end[e]
+                    if w == v:
+                         block[e] = count
+                         count += 1
+                         continue
+                    edge_stack.append(e)
+                    if disc[w] < 0:
+                         disc[w] = low[w] = number
+                         number += 1
+                         cursors[-1] = i
+                         verts.append(w)
+                         cursors.append(0)
+                         via.append(e)
+                         break
+                    if disc[w] < low[v]:
+                         low[v] = disc[w]
+               else:
+                    verts.pop()
+                    cursors.pop()
+                    e = via.pop()
+                    if not verts:
+                         break
+                    u = verts[-1]
+                    if low[v] < low[u]:
+                         low[u] = low[v]
+                    if low[v] >= disc[u]:
+                         if u == r:
+                              children += 1
+                         else:
+                              cut[u] = True
+                         bridge[e] = low[v] > disc[u]
+                         f = -1
+                         while not f == e:
+                              f = edge_stack.pop()
+                              block[f] = count
+                         count += 1
+          cut[r] = children >= 2
+     return cut, bridge, block
+
+# least recently used cache of search trees, a tuple of compact arrays
+# per key such as ("bfs", s), holding at most max_bytes of arrays. the
+# entries belong to one version of the graph: a lookup under another
+# version empties the cache first, so edge updates invalidate it.
+class SearchCache:
+     def __init__(self, max_bytes):
+          self.max_bytes = max_bytes
+          self.entries = OrderedDict()
+          self.nbytes = 0
+          self.version = None
+          self.hits = 0
+          self.misses = 0
+          self.evictions = 0
+          self.invalidations = 0
+
+     def get(self, key, version):
+          if not version == self.version:
+               if self.entries:
+                    self.invalidations += 1
+               self.clear()
+               self.version = version
+          tree = self.entries.get(key)
+          if tree is None:
+               self.misses += 1
+               return None
+          self.entries.move_to_end(key)
+          self.hits += 1
+          return tree
+
+     # trees larger than the whole budget are not kept.
+     def put(self, key, tree):
+          size = sum(a.itemsize * len(a) for a in tree)
+          if size > self.max_bytes:
+               return
+          self.entries[key] = tree
+          self.nbytes += size
+          while self.nbytes > self.max_bytes:
+               key, tree = self.entries.popitem(last=False)
+               self.nbytes -= sum(a.itemsize * len(a) for a in tree)
+               self.evictions += 1
+
+     def clear(self):
+          self.entries.clear()
+          self.nbytes = 0
+
+     def stats(self):
+          return {"hits": self.hits, "misses": self.misses,
+                  "evictions": self.evictions,
+                  "invalidations": self.invalidations,
+                  "entries": len(self.entries), "bytes": self.nbytes}
+
+# strongly connected components of a directed graph g from its verts
+# in increasing finishing order of a depth first search along
+# edges_from (the second pass of kosaraju): taking verts in decreasing
+# finishing order, each unassigned one collects its component by a
+# search backward along edges_to. returns (comp, count), comp[v] being
+# the component id of v. ids follow a topological order of the
+# components.
+def kosaraju_components(g, finished):
+     other_end, removed_edges = g.other_end, g.removed_edges
+     comp = array(int_typecode(g.n + 1), [-1]) * g.n
+     count = 0
+     for s in reversed(finished):
+          if comp[s] >= 0:
+               continue
+          comp[s] = count
+          stack = [s]
+          while stack:
+               v = stack.pop()
+               for e in g.edges_to[v]:
+                    if removed_edges[e]:
+                         continue
+                    u = v ^ other_end[e]
+                    if comp[u] < 0:
+                         comp[u] = count
+                         stack.append(u)
+          count += 1
+     return comp, count
+
+# kosaraju_components of g with the finishing order of a depth first
+# search in local arrays, the one depth_search_stack labels in
+# postorder. the labels and search variables of g are left alone.
+def scc_ids(g):
+     other_end, removed_edges = g.other_end, g.removed_edges
+     visited = bytearray(g.n)
+     cursor = [0] * g.n
+     finished = array(int_typecode(g.n + 1))
+     for s in range(g.n):
+          if visited[s]:
+               continue
+          visited[s] = True
+          stack = [s]
+          while stack:
+               v = stack[-1]
+               ids = g.edges_from[v]
+               i = cursor[v]
+               k = len(ids)
+               while i < k:
+                    e = ids[i]
+                    i += 1
+                    if removed_edges[e]:
+                         continue
+                    w = v ^ other_end[e]
+                    if not visited[w]:
+                         visited[w] = True
+                         stack.append(w)
+                         break
+               else:
+                    stack.pop()
+                    finished.append(v)
+               cursor[v] = i
+     return kosaraju_components(g, finished)
+
+# condensation DAG of g for the component ids comp of count
+# components: one vert per component and one edge per pair of
+# components joined by some edge, in array storage.
+def condense(g, comp, count):
+     pairs = set()
+     for u, v in g.live_edges():
+          a, b = comp[u], comp[v]
+          if not a == b:
+               pairs.add(a * count + b)
+     flat = array(int_typecode(max(count, 2 * len(pairs)) + 1))
+     for p in sorted(pairs):
+          flat.append(p // count)
+          flat.append(p % count)
+     return DirectedGraph(flat, n=count)
+
+# reachability index of a directed graph g: the strongly connected
+# component of every vert and, per component c of the condensation
+# DAG, a python int used as a bitset with bit d set when c reaches d.
+# components are numbered in topological order, so the sets are ORed
+# together in one pass from the last component back. the sets take
+# about k * k / 8 bytes for k components. build_seconds and nbytes
+# report the cost of the index, version the graph version it is for.
+class ReachabilityIndex:
+     def __init__(self, g):
+          t = time.perf_counter()
+          self.version = g.version
+          self.comp, count = scc_ids(g)
+          dag = condense(g, self.comp, count)
+          other_end = dag.other_end
+          reach = [0] * dag.n
+          for c in reversed(range(dag.n)):
+               bits = 1 << c
+               for e in dag.edges_from[c]:
+                    bits |= reach[c ^ other_end[e]]
+               reach[c] = bits
+          self.reach = reach
+          self.build_seconds = time.perf_counter() - t
+          self.nbytes = (sum(map(sys.getsizeof, reach)) +
+                         self.comp.itemsize * len(self.comp))
+
+     def reachable(self, s, t):
+          return self.reach[self.comp[s]] >> self.comp[t] & 1 == 1
+
+     # (verts, edge ids) of a path s -> t in g, ([], []) when there is
+     # none. the depth first search only enters verts that reach t, so
+     # it heads for t instead of exploring the graph.
+     def path(self, g, s, t):
+          if not self.reachable(s, t):
+               return [], []
+          other_end, removed_edges = g.other_end, g.removed_edges
+          target = self.comp[t]
+          reach = self.reach
+          comp = self.comp
+          parent = {s: -1}
+          verts, cursors = [s], [0]
+          while not verts[-1] == t:
+               v = verts[-1]
+               ids = g.edges_from[v]
+               i = cursors[-1]
+               k = len(ids)
+               while i < k:
+                    e = ids[i]
+                    i += 1
+                    if removed_edges[e]:
+                         continue
+                    w = v ^ other_end[e]
+                    if not w in parent and reach[comp[w]] >> target & 1:
+                         parent[w] = e
+                         cursors[-1] = i
+                         verts.append(w)
+                         cursors.append(0)
+                         break
+               else:
+                    verts.pop()
+                    cursors.pop()
+          return tree_path(g.edges, parent, s, t)
+
+# level synchronous breadth first search from s that switches between
+# top-down steps, expanding the out edges (out_adj) of the frontier,
+# and bottom-up steps, where every unvisited vert scans its in edges
+# (in_adj) for a parent in the frontier, held in a bytearray bitmap,
+# and stops at the first one. following beamer et al., it goes
+# bottom-up once the out edges of the frontier outnumber 1 / alpha of
+# the in edges of the unvisited verts, and back top-down once the
+# frontier shrinks below n / beta verts. returns (parent, dist) as
+# bfs_tree does; dist is the same, parent may be another edge of the
+# same level. when stats is a list, a (level, "top-down" or
+# "bottom-up", frontier size, edges examined) tuple is appended to it
+# for every level. the edge counts include removed edges until the
+# graph is compacted.
+def direction_optimizing_bfs(g, out_adj, in_adj, s, alpha=14, beta=24,
+                             stats=None):
+     other_end, removed_edges = g.other_end, g.removed_edges
+     n = g.n
+     tc = int_typecode(max(n, g.m) + 1)
+     parent = array(tc, [-1]) * n
+     dist = array(tc, [-1]) * n
+     dist[s] = 0
+     frontier = [s]
+     unvisited = range(n)
+     # in edges of the unvisited verts.
+     m_u = g.m - len(in_adj[s])
+     bottom_up = False
+     size = n
+     d = 0
+     while frontier:
+          d += 1
+          m_f = sum(map(len, map(out_adj.__getitem__, frontier)))
+          if not bottom_up:
+               bottom_up = m_f > m_u / alpha
+          elif len(frontier) < n / beta and len(frontier) < size:
+               bottom_up = False
+          next_frontier = []
+          if bottom_up:
+               examined = 0
+               bitmap = bytearray(n)
+               for v in frontier:
+                    bitmap[v] = 1
+               unvisited = [w for w in unvisited if dist[w] < 0]
+               for w in unvisited:
+                    for e in in_adj[w]:
+                         examined += 1
+                         if bitmap[w ^ other_end[e]] and not removed_edges[e]:
+                              dist[w] = d
+                              parent[w] = e
+                              next_frontier.append(w)
+                              break
+          else:
+               examined = m_f
+               for v in frontier:
+                    for e in out_adj[v]:
+                         if removed_edges[e]:
+                              continue
+                         w = v ^ other_end[e]
+                         if dist[w] < 0:
+                              dist[w] = d
+                              parent[w] = e
+                              next_frontier.append(w)
+          m_u -= sum(map(len, map(in_adj.__getitem__, next_frontier)))
+          if stats is not None:
+               stats.append((d - 1, "bottom-up" if bottom_up else "top-down",
+                             len(frontier), examined))
+          size = len(frontier)
+          frontier = next_frontier
+     return parent, dist
+
+# bidirectional breadth first search for a shortest path s -> t,
+# following out_adj forward from s and in_adj backward from t. each
+# step expands one whole level of the side whose frontier is smaller;
+# once the sides meet, the shortest of the paths through the meeting
+# edges of that level is returned as (verts, edge ids, number of verts
+# visited), with ([], [], visited) when t is unreachable. search state
+# lives in dicts, so the cost follows the part of the graph visited.
+def bidirectional_bfs(g, out_adj, in_adj, s, t):
+     edges, other_end = g.edges, g.other_end
+     removed_edges = g.removed_edges
+     if s == t:
+          return [s], [], 1
+     parent_f, parent_b = {s: -1}, {t: -1}
+     dist_f, dist_b = {s: 0}, {t: 0}
+     frontier_f, frontier_b = [s], [t]
+     while frontier_f and frontier_b:
+          forward = len(frontier_f) <= len(frontier_b)
+          if forward:
+               adj, parent, dist, other = out_adj, parent_f, dist_f, dist_b
+               frontier = frontier_f
+          else:
+               adj, parent, dist, other = in_adj, parent_b, dist_b, dist_f
+               frontier = frontier_b
+          best, meet = -1, None
+          next_frontier = []
+          for v in frontier:
+               d = dist[v] + 1
+               for e in adj[v]:
+                    if removed_edges[e]:
+                         continue
+                    w = v ^ other_end[e]
+                    if w in other:
+                         length = d + other[w]
+                         if best < 0 or length < best:
+                              best, meet = length, (v, w, e)
+                    if not w in dist:
+                         dist[w] = d
+                         parent[w] = e
+                         next_frontier.append(w)
+          if forward:
+               frontier_f = next_frontier
+          else:
+               frontier_b = next_frontier
+          if meet is not None:
+               break
+     visited = len(dist_f) + len(dist_b)
+     if meet is None:
+          return [], [], visited
+     v, w, e = meet
+     if not forward:
+          v, w = w, v
+     # v is on the forward side, w on the backward side of edge e.
+     verts, ids = tree_path(edges, parent_f, s, v)
+     back_verts, back_ids = tree_path(edges, parent_b, t, w)
+     back_verts.reverse()
+     back_ids.reverse()
+     return verts + back_verts, ids + [e] + back_ids, visited
+
+# weighted shortest paths from s over adj, weights[e] >= 0 being the
+# length of edge e. returns (dist, parent) as dag_paths does. when t
+# is given the search stops once t is settled, and only the entries of
+# settled verts (those not farther than t) are final.
+
+# dijkstra with a binary heap of (dist, vert) entries. an improved
+# vert is pushed again instead of decreasing its key, and the stale
+# entries left behind are skipped when popped.
+def dijkstra_heap(g, adj, s, weights, t=None):
+     other_end, removed_edges = g.other_end, g.removed_edges
+     dist = [None] * g.n
+     parent = array(int_typecode(max(g.n, g.m) + 1), [-1]) * g.n
+     done = bytearray(g.n)
+     dist[s] = 0
+     heap = [(0, s)]
+     while heap:
+          d, v = heappop(heap)
+          if done[v]:
+               continue
+          done[v] = True
+          if v == t:
+               break
+          for e in adj[v]:
+               if removed_edges[e]:
+                    continue
+               w = v ^ other_end[e]
+               x = d + weights[e]
+               if dist[w] is None or x < dist[w]:
+                    dist[w] = x
+                    parent[w] = e
+                    heappush(heap, (x, w))
+     return dist, parent
+
+# dijkstra with a bucket queue (dial's algorithm) for integer weights in
+# [0, max_weight]. tentative distances lie within max_weight of the
+# current one, so max_weight + 1 buckets used cyclically suffice, and
+# an entry is stale when its vert has got a smaller distance since.
+def dijkstra_bucket(g, adj, s, weights, max_weight, t=None):
+     other_end, removed_edges = g.other_end, g.removed_edges
+     dist = [None] * g.n
+     parent = array(int_typecode(max(g.n, g.m) + 1), [-1]) * g.n
+     dist[s] = 0
+     k = max_weight + 1
+     buckets = [[] for i in range(k)]
+     buckets[0].append(s)
+     pending = 1
+     d = 0
+     while pending:
+          bucket = buckets[d % k]
+          while bucket:
+               v = bucket.pop()
+               pending -= 1
+               if not dist[v] == d:
+                    continue
+               if v == t:
+                    return dist, parent
+               for e in adj[v]:
+                    if removed_edges[e]:
+                         continue
+                    w = v ^ other_end[e]
+                    x = d + weights[e]
+                    if dist[w] is None or x < dist[w]:
+                         dist[w] = x
+                         parent[w] = e
+                         buckets[x % k].append(w)
+                         pending += 1
+          d += 1
+     return dist, parent
+
+# (verts, edge ids) of the path s -> t in a search tree given by parent
+# edges, ([], []) when t was not reached.
+def tree_path(edges, parent, s, t):
+     if not t == s and parent[t] < 0:
+          return [], []
+     verts, ids = [t], []
+     v = t
+     while not v == s:
+          e = parent[v]
+          x, y = edges[e]
+          v = x + y - v
+          verts.append(v)
+          ids.append(e)
+     verts.reverse()
+     ids.reverse()
+     return verts, ids
+
+# BFS distances from s over csr arrays (offsets, nbrs), the part of a
+# search that batch_bfs runs in worker processes. returns the distance
+# array, or the distances of targets when given, stopping once every
+# target is dequeued.
+def bfs_distances(offsets, nbrs, n, s, targets=None):
+     tc = int_typecode(n + 1)
+     dist = array(tc, [-1]) * n
+     dist[s] = 0
+     remaining = set(targets) if targets is not None else None
+     queue = array(tc, [s])
+     head = 0
+     while head < len(queue):
+          v = queue[head]
+          head += 1
+          if remaining is not None:
+               remaining.discard(v)
+               if not remaining:
+                    break
+          d = dist[v] + 1
+          for w in nbrs[offsets[v]:offsets[v + 1]]:
+               if dist[w] < 0:
+                    dist[w] = d
+                    queue.append(w)
+     if targets is not None:
+          return [dist[t] for t in targets]
+     return dist
+
+# copy arrays into new shared memory blocks, returning the blocks.
+def share_arrays(arrays):
+     blocks = []
+     for a in arrays:
+          size = len(a) * a.itemsize
+          block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+          block.buf[:size] = memoryview(a).cast("B")
+          blocks.append(block)
+     return blocks
+
+# csr arrays of the graph in a batch_bfs worker process, attached from
+# shared memory by attach_csr.
+worker_csr = None
+
+def attach_csr(names, tc, lengths, n, targets):
+     global worker_csr
+     blocks = [shared_memory.SharedMemory(name=name) for name in names]
+     offsets, nbrs = [block.buf[:k * array(tc).itemsize].cast(tc)
+                      for block, k in zip(blocks, lengths)]
+     worker_csr = blocks, offsets, nbrs, n, targets
+
+def bfs_distances_worker(s):
+     blocks, offsets, nbrs, n, targets = worker_csr
+     return bfs_distances(offsets, nbrs, n, s, targets)
+
+# BFS distances from every vert of sources, in that order, fanned out
+# to a pool of processes. the csr arrays of the graph are placed in
+# shared memory once and every worker only allocates its own distance
+# arrays. processes=1 runs the searches in this process.
+def batch_bfs(offsets, nbrs, n, sources, targets=None, processes=None,
+              chunksize=16):
+     if processes == 1:
+          return [bfs_distances(offsets, nbrs, n, s, targets)
+                  for s in sources]
+     blocks = share_arrays((offsets, nbrs))
+     try:
+          initargs = ([block.name for block in blocks],
+                      memoryview(offsets).format,
+                      (len(offsets), len(nbrs)), n, targets)
+          with Pool(processes, attach_csr, initargs) as pool:
+               return pool.map(bfs_distances_worker, sources, chunksize)
+     finally:
+          for block in blocks:
+               block.close()
+               block.unlink()
+
+# reentrant traversals. bfs() and dfs() only read the graph and return
+# their results in a SearchResult, keeping their state in locals and in
+# a Scratch taken from scratch_pool, so any number of them can run on a
+# shared graph from several threads.
+
+# per-vert visited marks of a traversal. a vert counts as visited when
+# its mark equals the epoch of the traversal using the scratch, so
+# starting a traversal bumps the epoch instead of clearing n marks.
+class Scratch:
+     max_epoch = 2**32 - 1
+     def __init__(self, n):
+          self.mark = array("L", [0]) * n
+          self.epoch = 0
+
+     def next_epoch(self):
+          if self.epoch == Scratch.max_epoch:
+               self.mark = array("L", [0]) * len(self.mark)
+               self.epoch = 0
+          self.epoch += 1
+          return self.epoch
+
+# free Scratch objects by number of verts, shared between threads.
+class ScratchPool:
+     def __init__(self):
+          self.free = {}
+          self.lock = Lock()
+
+     def acquire(self, n):
+          with self.lock:
+               scratches = self.free.get(n)
+               if scratches:
+                    return scratches.pop()
+          return Scratch(n)
+
+     def release(self, scratch):
+          with self.lock:
+               self.free.setdefault(len(scratch.mark), []).append(scratch)
+
+scratch_pool = ScratchPool()
+
+# verts reached by a traversal from source. order lists them in
+# visiting order (preorder or postorder for dfs), parent maps each to
+# the id of the edge it was reached by (-1 for source), and dist (bfs
+# only) to its number of edges from source. only reached verts are
+# stored, so small searches give small results.
+class SearchResult:
+     def __init__(self, edges, source, order, parent, dist=None):
+          self.edges = edges
+          self.source = source
+          self.order = order
+          self.parent = parent
+          self.dist = dist
+
+     def reached(self, v):
+          return v in self.parent
+
+     # labels in the manner of the search methods, 0 for unreached verts.
+     def labels(self, n):
+          labels = [0] * n
+          for i, v in enumerate(self.order):
+               labels[v] = i + 1
+          return labels
+
+     # tree path source -> t as (verts, edge ids), ([], []) if unreached.
+     def path_to(self, t):
+          if not t in self.parent:
+               return [], []
+          return tree_path(self.edges, self.parent, self.source, t)
+
+def bfs(g, s):
+     edges, other_end, adj = g.edges, g.other_end, g.adjacency()
+     removed_edges = g.removed_edges
+     scratch = scratch_pool.acquire(g.n)
+     try:
+          mark, epoch = scratch.mark, scratch.next_epoch()
+          mark[s] = epoch
+          order, parent, dist = [s], {s: -1}, {s: 0}
+          head = 0
+          while head < len(order):
+               v = order[head]
+               head += 1
+               d = dist[v] + 1
+               for e in adj[v]:
+                    if removed_edges[e]:
+                         continue
+                    w = v ^ other_end[e]
+                    if not mark[w] == epoch:
+                         mark[w] = epoch
+                         order.append(w)
+                         parent[w] = e
+                         dist[w] = d
+     finally:
+          scratch_pool.release(scratch)
+     return SearchResult(edges, s, order, parent, dist)
+
+# stack depth first search, with the (vertex, edge cursor) pairs of the
+# stack kept in two lists.
+def dfs(g, s, postorder=False):
+     edges, other_end, adj = g.edges, g.other_end, g.adjacency()
+     removed_edges = g.removed_edges
+     scratch = scratch_pool.acquire(g.n)
+     try:
+          mark, epoch = scratch.mark, scratch.next_epoch()
+          mark[s] = epoch
+          order, parent = [], {s: -1}
+          if not postorder:
+               order.append(s)
+          verts, cursors = [s], [0]
+          while verts:
+               v = verts[-1]
+               ids = adj[v]
+               i = cursors[-1]
+               k = len(ids)
+               while i < k:
+                    e = ids[i]
+                    i += 1
+                    if removed_edges[e]:
+                         continue
+                    w = v ^ other_end[e]
+                    if not mark[w] == epoch:
+                         mark[w] = epoch
+                         parent[w] = e
+                         if not postorder:
+                              order.append(w)
+                         cursors[-1] = i
+                         verts.append(w)
+                         cursors.append(0)
+                         break
+               else:
+                    verts.pop()
+                    cursors.pop()
+                    if postorder:
+                         order.append(v)
+     finally:
+          scratch_pool.release(scratch)
+     return SearchResult(edges, s, order, parent)
+
+# streaming traversals. these generators yield as the search proceeds,
+# so a consumer can stop them at any point and no further work is done.
+# with s=None they cover the whole graph, starting new searches from
+# unvisited verts in increasing order as the search methods do.
+
+# verts in breadth first order (the order breadth_search labels them).
+def iter_bfs(g, s=None):
+     other_end, adj = g.other_end, g.adjacency()
+     removed_edges = g.removed_edges
+     scratch = scratch_pool.acquire(g.n)
+     try:
+          mark, epoch = scratch.mark, scratch.next_epoch()
+          for r in range(g.n) if s is None else (s,):
+               if mark[r] == epoch:
+                    continue
+               mark[r] = epoch
+               yield r
+               queue = deque([r])
+               while queue:
+                    v = queue.popleft()
+                    for e in adj[v]:
+                         if removed_edges[e]:
+                              continue
+                         w = v ^ other_end[e]
+                         if not mark[w] == epoch:
+                              mark[w] = epoch
+                              yield w
+                              queue.append(w)
+     finally:
+          scratch_pool.release(scratch)
+
+# (event, vertex, edge) tuples of a depth first search:
+#   ("discover", v, e)  v is reached through e (-1 for a search root)
+#   ("tree", v, e)      e leads from v to an undiscovered vert
+#   ("back", v, e)      e leads from v to a vert on the stack
+#   ("nontree", v, e)   e leads from v to a finished vert
+#   ("finish", v, e)    all edges of v are done, e as for discover
+# every edge is reported once, also in undirected graphs.
+def dfs_events(g, s=None):
+     other_end, adj = g.other_end, g.adjacency()
+     removed_edges = g.removed_edges
+     scratch = scratch_pool.acquire(g.n)
+     edge_scratch = scratch_pool.acquire(g.m)
+     try:
+          mark, epoch = scratch.mark, scratch.next_epoch()
+          edge_mark, edge_epoch = edge_scratch.mark, edge_scratch.next_epoch()
+          on_stack = set()
+          for r in range(g.n) if s is None else (s,):
+               if mark[r] == epoch:
+                    continue
+               mark[r] = epoch
+               yield "discover", r, -1
+               verts, cursors, via = [r], [0], [-1]
+               on_stack.add(r)
+               while verts:
+                    v = verts[-1]
+                    ids = adj[v]
+                    i = cursors[-1]
+                    k = len(ids)
+                    while i < k:
+                         e = ids[i]
+                         i += 1
+                         if edge_mark[e] == edge_epoch or removed_edges[e]:
+                              continue
+                         edge_mark[e] = edge_epoch
+                         w = v ^ other_end[e]
+                         if not mark[w] == epoch:
+                              mark[w] = epoch
+                              cursors[-1] = i
+                              yield "tree", v, e
+                              yield "discover", w, e
+                              verts.append(w)
+                              cursors.append(0)
+                              via.append(e)
+                              on_stack.add(w)
+                              break
+                         yield ("back" if w in on_stack else "nontree"), v, e
+                    else:
+                         verts.pop()
+                         cursors.pop()
+                         on_stack.discard(v)
+                         yield "finish", v, via.pop()
+     finally:
+          scratch_pool.release(edge_scratch)
+          scratch_pool.release(scratch)
+
+# verts in depth first preorder or postorder (the order
+# depth_search_stack labels them).
+def iter_dfs(g, s=None, postorder=False):
+     wanted = "finish" if postorder else "discover"
+     for event, v, e in dfs_events(g, s):
+          if event == wanted:
+               yield v
+
+# disjoint set forest over verts 0..n-1 (union by rank with path
+# compression), kept in flat arrays. components counts the sets, so
+# edges can be fed in one at a time with add_edge and the connectivity
+# stays up to date without redoing any search.
+class DisjointSet:
+     def __init__(self, n, edges=()):
+          self.n = n
+          self.parent = array(int_typecode(n + 1), range(n))
+          self.rank = bytearray(n)
+          self.components = n
+          for u, v in edges:
+               self.union(u, v)
+
+     def find(self, v):
+          parent = self.parent
+          root = v
+          while not parent[root] == root:
+               root = parent[root]
+          while not parent[v] == root:
+               parent[v], v = root, parent[v]
+          return root
+
+     # merge the sets of u and v, returns False when already together.
+     def union(self, u, v):
+          u, v = self.find(u), self.find(v)
+          if u == v:
+               return False
+          if self.rank[u] < self.rank[v]:
+               u, v = v, u
+          self.parent[v] = u
+          if self.rank[u] == self.rank[v]:
+               self.rank[u] += 1
+          self.components -= 1
+          return True
+
+     def add_edge(self, u, v):
+          return self.union(u, v)
+
+     def add_vertex(self):
+          self.parent.append(self.n)
+          self.rank.append(0)
+          self.n += 1
+          self.components += 1
+          return self.n - 1
+
+     def connected(self, u, v):
+          return self.find(u) == self.find(v)
+
+     # component id of every vert, numbered 0, 1, ... in the order of
+     # their smallest verts (the order depth_search_stack finds them).
+     def component_ids(self):
+          ids = array(self.parent.typecode, [-1]) * self.n
+          comp = array(self.parent.typecode, [-1]) * self.n
+          count = 0
+          for v in range(self.n):
+               root = self.find(v)
+               if ids[root] < 0:
+                    ids[root] = count
+                    count += 1
+               comp[v] = ids[root]
+          return comp
+
 # Undirected Graph    
 class UndirectedGraph:
      preorder = 0
      postorder = 1
-     def __init__(self, g, n=-1, m=-1, labels=[], debug=False):
+     # storage="list" keeps edges and edges_at as python lists,
+     # storage="csr" keeps them in EdgeArray/CSRIndex arrays.
+     def __init__(self, g, n=-1, m=-1, labels=[], debug=False,
+                  storage="list"):
           self.debug = debug
           self.label = 1
-          if type(g) == list:
+          if not storage in ("list", "csr"):
+               raise ValueError("unknown storage %s" % storage)
+          self.storage = storage
+          if type(g) == list and storage == "csr":
+               self.n, self.m = check_nm(g, n, m)
+               tc = int_typecode(max(self.n, 2 * self.m) + 1)
+               self.init_csr(flat_edges(g, tc, 1))
+          # flat 0 origin edge array, see from_array.
+          elif type(g) == array:
+               self.storage = "csr"
+               self.n, self.m = check_nm_flat(g, n, m)
+               self.init_csr(g)
+          elif type(g) == list:
                self.n, self.m = check_nm(g, n, m)
                self.edges = add(-1, g)
                self.edges_at = [[] for i in range(self.n)]
@@ -53,16 +1533,26 @@ class UndirectedGraph:
                     self.edges_at[v].append(i)
           # DirectedGraph can be initialized by a DirectedGraph
           # every edge in Directedgraph is converted to an undirected edge.
-          # Vertices are kept as-is.
+          # Vertices are kept as-is, and so are the edge ids, but for the
+          # removed edges of g, which are left out as by g.compact(). a
+          # csr graph shares its edge array with g when g is csr too.
           elif type(g) == DirectedGraph:
-               self.n, self.m = g.n, g.m
-               self.edges = copy.deepcopy(g.edges)
-               for i in range(self.m):
-                    u, v = self.edges[i]
-                    self.edges_at[u].append(i)
-                    self.edges_at[v].append(i)
+               edges = g.live_edges()
+               self.n, self.m = g.n, len(edges)
+               if storage == "csr" and g.storage == "csr":
+                    self.init_csr(g.edges.flat)
+               elif storage == "csr":
+                    tc = int_typecode(max(self.n, 2 * self.m) + 1)
+                    self.init_csr(flat_edges(edges, tc))
+               else:
+                    self.edges = list(edges)
+                    self.edges_at = [[] for i in range(self.n)]
+                    for i, (u, v) in enumerate(self.edges):
+                         self.edges_at[u].append(i)
+                         self.edges_at[v].append(i)
           else:
                raise ValueError("initialize from unsupported data type.")
+          self.other_end = other_ends(self.edges, int_typecode(2 * self.n))
           if labels:
                self.labels = labels
           else:
@@ -70,21 +1560,187 @@ class UndirectedGraph:
           self.visited_vertices = [False] * self.n
           self.visited_edges = [False] * self.m
           self.order = UndirectedGraph.preorder
+          self.version = 0
+          self.removed = 0
+          self.removed_edges = bytearray(self.m)
           
      def __str__(self):
           s = "n, m = %d, %d" % (self.n, self.m)
-          s += "\nedges: %s" % str(add(1, self.edges))
-          s += "\nedges_at: %s" % str(add(1, self.edges_at))
+          s += "\nedges: %s" % str(add(1, as_list(self.edges)))
+          s += "\nedges_at: %s" % str(add(1, as_list(self.edges_at)))
           if self.labels:
                s += "\nlabels: %s" % str(self.labels)
           return s
 
-     def dprint(self, args, **kwargs):
-         # debug print function
+     # mutation, in list storage only. edge ids stay valid until
+     # compact(): a removed edge leaves a tombstone (None) in edges,
+     # counted by removed, and m keeps counting every id. its id also
+     # stays in the incidence lists, flagged in the removed_edges bitmap
+     # the searches skip, so removal costs O(1). version is bumped by
+     # every change, so searches and caches can tell the graph changed
+     # since they ran.
+     def check_mutable(self):
+          if not self.storage == "list":
+               raise ValueError("graphs in %s storage can not be changed"
+                                % self.storage)
+
+     # save() needs the edge ids free of tombstones.
+     def check_compacted(self):
+          if self.removed:
+               raise ValueError("graph has %d removed edges, compact() it"
+                                " first" % self.removed)
+
+     # edges without the tombstones, in the order compact() numbers them.
+     def live_edges(self):
+          if not self.removed:
+               return self.edges
+          return [edge for edge in self.edges if edge is not None]
+
+     def add_vertex(self):
+          self.check_mutable()
+          self.edges_at.append([])
+          self.labels.append(0)
+          self.visited_vertices.append(False)
+          self.n += 1
+          self.version += 1
+          return self.n - 1
+
+     # new edge (u, v) with the next free id, which is returned.
+     def add_edge(self, u, v):
+          self.check_mutable()
+          assert(0 <= u and u < self.n and 0 <= v and v < self.n)
+          e = self.m
+          self.edges.append((u, v))
+          self.edges_at[u].append(e)
+          self.edges_at[v].append(e)
+          if u ^ v >= 2**31 and self.other_end.typecode == "i":
+               self.other_end = array("q", self.other_end)
+          self.other_end.append(u ^ v)
+          self.visited_edges.append(False)
+          self.removed_edges.append(False)
+          self.m += 1
+          self.version += 1
+          return e
+
+     # the id stays in the incidence lists of both end points, which so
+     # keep the increasing order the searches rely on.
+     def remove_edge(self, e):
+          self.check_mutable()
+          if self.edges[e] is None:
+               raise ValueError("edge %d is already removed" % (e + 1))
+          self.removed_edges[e] = True
+          self.edges[e] = None
+          self.removed += 1
+          self.version += 1
+
+     # drop the tombstones, renumbering the remaining edges in their
+     # order. returns the array of new ids indexed by old id, -1 for
+     # removed edges.
+     def compact(self):
+          self.check_mutable()
+          live = [e for e in range(self.m) if self.edges[e] is not None]
+          new_id = array(int_typecode(self.m + 1), [-1]) * self.m
+          for i, e in enumerate(live):
+               new_id[e] = i
+          self.edges = [self.edges[e] for e in live]
+          self.edges_at = [[new_id[e] for e in ids if new_id[e] >= 0]
+                           for ids in self.edges_at]
+          self.other_end = array(self.other_end.typecode,
+                                 map(self.other_end.__getitem__, live))
+          self.m = len(live)
+          self.visited_edges = [False] * self.m
+          self.removed_edges = bytearray(self.m)
+          self.removed = 0
+          self.version += 1
+          return new_id
+
+     # bulk construction from an (m, 2) integer array or buffer of edges
+     # in origin `origin` (a flat buffer of 2m verts works too).
+     # the edges are copied into array storage once and the incidence
+     # index is built by sorting, without going through add().
+     @classmethod
+     def from_array(cls, data, n=-1, m=-1, origin=1, labels=[],
+                    debug=False):
+          raw = int_array(data)
+          n, m = check_nm_flat(raw, n, m, origin)
+          flat = shift_array(raw, int_typecode(max(n, 2 * m) + 1), origin)
+          return cls(flat, n, m, labels, debug)
+
+     # construction from an edge list file (text, csv or gzip), streamed
+     # into array storage by read_edge_file. n and m are guessed from the
+     # file when not given, and checked against it when given.
+     @classmethod
+     def from_file(cls, path, n=-1, m=-1, origin=1, labels=[], debug=False,
+                   delimiter=None, comments="#"):
+          flat, n1 = read_edge_file(path, origin, delimiter, comments)
+          if m >= 0 and not m == len(flat) // 2:
+               raise ValueError("number of edges does not match with given m")
+          if 0 <= n < n1:
+               raise ValueError("%s has vertex %d beyond n = %d"
+                                % (path, n1 - 1 + origin, n))
+          return cls(flat, n1 if n < 0 else n, len(flat) // 2, labels, debug)
+
+     # write the graph in the binary format read by load(): the edges,
+     # other_end and the offsets, ids and nbrs arrays of edges_at. list
+     # storage is converted to arrays first.
+     def save(self, path):
+          self.check_compacted()
+          g = self
+          if self.storage == "list":
+               tc = int_typecode(max(self.n, 2 * self.m) + 1)
+               g = UndirectedGraph(flat_edges(self.edges, tc), self.n, self.m)
+          index = g.edges_at
+          write_graph_file(path, b"U", g.n, g.m,
+                           (g.edges.flat, g.other_end, index.offsets,
+                            index.ids, index.nbrs))
+
+     # graph saved by save(), in csr storage. the arrays are mapped from
+     # the file instead of read, so opening costs the same whatever the
+     # size of the graph. the search variables are left empty until the
+     # first search allocates them.
+     @classmethod
+     def load(cls, path, debug=False):
+          kind, n, m, arrays = map_graph_file(path)
+          if not kind == b"U":
+               raise ValueError("%s holds a directed graph" % path)
+          g = cls.__new__(cls)
+          g.debug = debug
+          g.label = 1
+          g.storage = "csr"
+          g.n, g.m = n, m
+          g.edges = EdgeArray(arrays[0])
+          g.other_end = arrays[1]
+          g.edges_at = CSRIndex(*arrays[2:5])
+          g.labels, g.visited_vertices, g.visited_edges = [], [], []
+          g.order = UndirectedGraph.preorder
+          g.version = 0
+          g.removed = 0
+          g.removed_edges = bytearray(m)
+          return g
+
+     # build array-backed edges/edges_at from a flat 0 origin edge array.
+     # incidence j of the flat array is end point j % 2 of edge j // 2,
+     # so sorting the flat array itself lists each vertex's edges in
+     # increasing id order.
+     def init_csr(self, flat):
+          tc = int_typecode(max(self.n, 2 * self.m) + 1)
+          self.edges = EdgeArray(flat)
+          order, offsets = csr_order(self.n, flat, tc)
+          ids = map_array(rshift, order, 1, tc)
+          nbrs = gather(flat, map_array(xor, order, 1, tc), tc)
+          self.edges_at = CSRIndex(offsets, ids, nbrs)
+
+     # incidence index searches follow from a vert.
+     def adjacency(self):
+          return self.edges_at
+
+     # debug print function. the message is formatted as fmt % args
+     # only when debug is on, so disabled calls cost no formatting.
+     def dprint(self, fmt, *args, **kwargs):
          if self.debug:
-              print(args, **kwargs)
-         else:
-              pass
+              if args:
+                   fmt = fmt % args
+              print(fmt, **kwargs)
 
      # in undirectional graphs,
      # edge with number e that has v and w as verts might be stored in the
@@ -98,37 +1754,64 @@ class UndirectedGraph:
           else:
                raise ValueError("edge %d has no end point v%d" % (e + 1, v + 1))
          
+     # run search(self, self.edges_at, v, *args) from every vert left
+     # unlabeled, returning the number of searches (components).
+     def label_notrace(self, search, *args):
+          components = 0
+          for v in range(self.n):
+               if self.labels[v] == 0:
+                    components += 1
+                    search(self, self.edges_at, v, *args)
+          return components
+
      def depth_search_recursive(self):
           self.init_search_variables()
+          if not self.debug:
+               # recursive labelling is the preorder stack labelling.
+               self.label_notrace(dfs_stack_notrace)
+               return
           for v in self.unlabeled_vertices():
                self.label_vertex(v)
                self.dfs_body(v)
 
-     def dfs_body(self, v):
-          found_unlabeled_vertex = False
-          unvisited_edges = (e for e in self.edges_at[v]
-                             if not self.visited_edges[e])
-          for e in unvisited_edges:
-               self.visited_edges[e] = True
-               # x, y = self.edges[e]
-               # self.dprint("checking e%d = %s" % (e + 1, (x + 1, y + 1)))
-               v, w = self.order_v_first(v, e)
-               self.dprint("found non-visited edge e%d with verts"
-                           " (v%d, v%d)" % (e + 1, v + 1, w + 1))
-               if self.labels[w] == 0:
-                    self.label_vertex(w)
-                    found_unlabeled_vertex = True
-                    self.dfs_body(w)
+     # depth first labelling of the verts reachable from s, in the order
+     # the recursive version gave. the recursion is replaced by an
+     # explicit stack of (vertex, edge cursor) pairs kept flat in an
+     # array, so paths of any depth are fine and a frame costs two ints.
+     def dfs_body(self, s):
+          stack = array(int_typecode(max(self.n, 2 * self.m) + 1), (s, 0))
+          while stack:
+               v, i = stack[-2], stack[-1]
+               edges = self.edges_at[v]
+               while i < len(edges):
+                    e = edges[i]
+                    i += 1
+                    if self.visited_edges[e]:
+                         continue
+                    self.visited_edges[e] = True
+                    w = v ^ self.other_end[e]
+                    self.dprint("found non-visited edge e%d with verts"
+                                " (v%d, v%d)", e + 1, v + 1, w + 1)
+                    if self.labels[w] == 0:
+                         self.label_vertex(w)
+                         break # descend into w
+                    else:
+                         self.dprint("v%d is already labeled as %d",
+                                     w + 1, self.labels[w])
                else:
-                    self.dprint("v%d is already labeled as %d" %
-                                (w + 1, self.labels[w]))
-          self.dprint("no more unvisited edges starting from v%d" % (v + 1))
+                    self.dprint("no more unvisited edges starting"
+                                " from v%d", v + 1)
+                    del stack[-2:] # return to the caller
+                    continue
+               stack[-1] = i
+               stack.append(w)
+               stack.append(0)
 
      # generator to obtain next unlabeled vertex.
      def unlabeled_vertices(self):
           for v in range(self.n):
                if self.labels[v] == 0:
-                    self.dprint("found unlabeled vert v%d" % (v + 1))
+                    self.dprint("found unlabeled vert v%d", v + 1)
                     yield v
           # exiting for loop means no unlabeled verts left.
 
@@ -143,7 +1826,7 @@ class UndirectedGraph:
      # the stack again.
           for v in range(self.v):
                if not self.visited_vertices[v]:
-                    self.dprint("found unvisited vert v%d" % (v + 1))
+                    self.dprint("found unvisited vert v%d", v + 1)
                     yield v
 
      # preorder: label vert when it's pushed into stack.
@@ -151,128 +1834,214 @@ class UndirectedGraph:
      def push(self, x):
           if self.order == UndirectedGraph.preorder:
                self.label_vertex(x)
-          self.dprint("pushing v%d into stack" % (x + 1))
+          self.dprint("pushing v%d into stack", x + 1)
           self.visited_vertices[x] = True
           self.stack.append(x)
-          self.dprint("stack = %s" % str_stack(self.stack))
+          if self.debug:
+               self.dprint("stack = %s", str_stack(self.stack))
 
      def pop(self):
           x = self.stack.pop()
           if self.order == UndirectedGraph.postorder:
                self.label_vertex(x)
-          self.dprint("popping v%d from stack" % (x + 1))
-          self.dprint("stack = %s" % str_stack(self.stack))
-          self.dprint("labels = %s" % self.labels)
+          self.dprint("popping v%d from stack", x + 1)
+          if self.debug:
+               self.dprint("stack = %s", str_stack(self.stack))
+               self.dprint("labels = %s", self.labels)
           return x
 
      # when to label the vert does not matter for queue. so we
      # always label it when it gets queued.
      def put(self, x):
           self.label_vertex(x)
-          self.dprint("putting v%d into queue" % (x + 1))
+          self.dprint("putting v%d into queue", x + 1)
           self.visited_vertices[x] = True
-          self.stack.insert(0, x)
-          self.dprint("queue = %s" % str_stack(self.stack))
+          self.queue.append(x)
+          if self.debug:
+               self.dprint("queue = %s", str_queue(self.queue))
 
      def get(self):
-          x = self.stack.pop()
-          self.dprint("dequeuing v%d from queue" % (x + 1))
-          self.dprint("queue = %s" % str_stack(self.stack))
-          self.dprint("labels = %s" % self.labels)
+          x = self.queue.popleft()
+          self.dprint("dequeuing v%d from queue", x + 1)
+          if self.debug:
+               self.dprint("queue = %s", str_queue(self.queue))
+               self.dprint("labels = %s", self.labels)
           return x
      
      def label_vertex(self, v):
-          self.dprint("v%d is unlabeled. labeling it as %d"
-                      % (v + 1, self.label))
+          self.dprint("v%d is unlabeled. labeling it as %d",
+                      v + 1, self.label)
           self.labels[v] = self.label
           self.label += 1
                
+     # removed edges start out visited, so the searches pass them by.
      def init_search_variables(self):
           self.labels = [0] * self.n
           self.visited_vertices = [False] * self.n
-          self.visited_edges = [False] * self.m
+          if self.removed:
+               self.visited_edges = list(map(bool, self.removed_edges))
+          else:
+               self.visited_edges = [False] * self.m
           self.label = 1
           self.stack = []
+          self.queue = deque()
+          self.cursor = [0] * self.n
+
+     # disjoint set forest of the graph's edges. more edges can be added
+     # to it with add_edge, connected(u, v) answering in O(a(n)).
+     def union_find(self):
+          return DisjointSet(self.n, self.live_edges())
+
+     # connected component id of every vert through union_find, without
+     # a search. sets self.components like depth_search_stack.
+     def connected_components(self):
+          forest = self.union_find()
+          self.components = forest.components
+          return forest.component_ids()
+
+     # (cut, bridge, block) arrays of the biconnected components, see
+     # biconnected_components: articulation flags per vert, bridge flags
+     # and block ids per edge. sets self.blocks to the number of blocks.
+     # unlike the search methods this leaves the search variables alone.
+     def biconnected_components(self):
+          cut, bridge, block = biconnected_components(self, self.edges_at)
+          self.blocks = max(block) + 1 if self.m else 0
+          self.dprint("the graph has %d blocks, %d cut verts and %d bridges.",
+                      self.blocks, cut.count(1), bridge.count(1))
+          return cut, bridge, block
+
+     # closed paths found by depth first search, yielded one at a time as
+     # they are found (parallel edges make closed paths of two edges).
+     def cycles(self):
+          return dfs_cycles(self, self.edges_at)
+
+     # whether the graph has a cycle, stopping at the first one.
+     def has_cycle(self):
+          for loop in self.cycles():
+               return True
+          return False
+
+     # generators of the verts in labelling order and of the search
+     # events, yielding as the search goes (see iter_bfs/dfs_events).
+     def iter_breadth_search(self):
+          return iter_bfs(self)
+
+     def iter_depth_search(self):
+          return iter_dfs(self, postorder=self.order == UndirectedGraph.postorder)
+
+     def depth_search_events(self):
+          return dfs_events(self)
 
      def depth_search_stack(self):
           self.init_search_variables()
+          if not self.debug:
+               self.components = self.label_notrace(
+                    dfs_stack_notrace, self.order == UndirectedGraph.postorder)
+               return
           components = 0
           for v in self.unlabeled_vertices(): # step 2(a)
                components += 1
                self.push(v)
                self.depth_search_from_stack_top() # step 2 (b)
           self.dprint("all vertices are labelled")
-          self.dprint("the graph has %d connected components." % components)
+          self.dprint("the graph has %d connected components.", components)
           self.components = components
           
      def depth_search_from_stack_top(self):
           while self.stack:
                # step 2 (b)(i) start
                v = self.stack[-1] # peek stack top
-               self.dprint("stack not empty, top is v%d" % (v + 1))
-               self.dprint("originating search from v%d" % (v + 1))
+               self.dprint("stack not empty, top is v%d", v + 1)
+               self.dprint("originating search from v%d", v + 1)
                # step 2 (b)(i) end
                # step 2 (b)(ii) start
                pushed_new_vert = False
-               unvisited_edges = (e for e in self.edges_at[v]
-                                  if not self.visited_edges[e])
-               for e in unvisited_edges:
+               # resume the scan of v's edges where it stopped the last
+               # time v was on the stack top, so every edge is examined
+               # only once.
+               edges = self.edges_at[v]
+               i = self.cursor[v]
+               while i < len(edges):
+                    e = edges[i]
+                    i += 1
+                    if self.visited_edges[e]:
+                         continue
                     self.visited_edges[e] = True
-                    v, w = self.order_v_first(v, e)
+                    w = v ^ self.other_end[e]
                     self.dprint("found non-visited edge e%d with verts"
-                                " (v%d, v%d)" % (e + 1, v + 1, w + 1))
+                                " (v%d, v%d)", e + 1, v + 1, w + 1)
                     if not self.visited_vertices[w]:
                          self.push(w)
                          pushed_new_vert = True
-                         break # from for loop
+                         break # from edge loop
                     else:
-                         self.dprint("v%d is already labeled as %d" %
-                                     (w + 1, self.labels[w]))
+                         self.dprint("v%d is already labeled as %d",
+                                     w + 1, self.labels[w])
+               self.cursor[v] = i
                if pushed_new_vert:
                     continue # back to top of while loop
                else:
                     x = self.pop() # dropping v from stack
                self.dprint("no more unvisited edges starting"
-                           " from v%d" % (v + 1))
+                           " from v%d", v + 1)
 
      def breadth_search(self):
           self.init_search_variables()
+          if not self.debug:
+               self.label_notrace(bfs_notrace)
+               return
           for v in self.unlabeled_vertices(): # step 2(a)
                self.put(v)
                self.breadth_search_from_queue_top() # step 2 (b)
           self.dprint("all vertices are labelled")
                
      def breadth_search_from_queue_top(self):
-          while self.stack:
-               v = self.stack[-1]
-               self.dprint("queue not empty, top is v%d" % (v + 1))
+          while self.queue:
+               v = self.queue[0]
+               self.dprint("queue not empty, top is v%d", v + 1)
                v = self.get()
-               self.dprint("originating search from v%d" % (v + 1))
+               self.dprint("originating search from v%d", v + 1)
                unvisited_edges = (e for e in self.edges_at[v]
                                   if not self.visited_edges[e])
                for e in unvisited_edges:
                     self.visited_edges[e] = True
-                    v, w = self.order_v_first(v, e)
+                    w = v ^ self.other_end[e]
                     self.dprint("found non-visited edge e%d with verts"
-                                " (v%d, v%d)" % (e + 1, v + 1, w + 1))
+                                " (v%d, v%d)", e + 1, v + 1, w + 1)
                     if not self.visited_vertices[w]:
                          self.put(w)
                          put_new_vert = True
                     else:
-                         self.dprint("v%d is already labeled as %d" %
-                                     (w + 1, self.labels[w]))
+                         self.dprint("v%d is already labeled as %d",
+                                     w + 1, self.labels[w])
                self.dprint("no more unvisited edges starting"
-                           " from v%d" % (v + 1))
+                           " from v%d", v + 1)
 
 # Directed Graph    
 class DirectedGraph:
      preorder = 0
      postorder = 1
-     def __init__(self, g, n=-1, m=-1, labels=[], debug=False):
+     # storage="list" keeps edges, edges_from and edges_to as python lists,
+     # storage="csr" keeps them in EdgeArray/CSRIndex arrays.
+     # weights are optional edge lengths, see set_weights.
+     def __init__(self, g, n=-1, m=-1, labels=[], debug=False,
+                  storage="list", weights=None):
           self.debug = debug
           self.detect_loop = False
           self.label = 1
-          if type(g) == list:
+          if not storage in ("list", "csr"):
+               raise ValueError("unknown storage %s" % storage)
+          self.storage = storage
+          if type(g) == list and storage == "csr":
+               self.n, self.m = check_nm(g, n, m)
+               tc = int_typecode(max(self.n, 2 * self.m) + 1)
+               self.init_csr(flat_edges(g, tc, 1))
+          # flat 0 origin edge array, see from_array.
+          elif type(g) == array:
+               self.storage = "csr"
+               self.n, self.m = check_nm_flat(g, n, m)
+               self.init_csr(g)
+          elif type(g) == list:
                self.n, self.m = check_nm(g, n, m)
                self.edges = add(-1, g)
                self.edges_from = [[] for i in range(self.n)]
@@ -283,22 +2052,37 @@ class DirectedGraph:
                     self.edges_to[v].append(i)
           # DirectedGraph can be initialized by a UndirectedGraph
           # every edge in UndirectedGraph is converted to a pair of edges in
-          # both directions. Vertices are kept as-is.
+          # both directions. Vertices are kept as-is. edge i of g becomes
+          # edges 2i = (u, v) and 2i + 1 = (v, u), i counting the edges
+          # left once the removed ones are dropped as by g.compact().
           elif type(g) == UndirectedGraph:
-               self.n, self.m = g.n, 2 * g.m
-               self.edges = []
-               for e in g.edges:
-                    u, v = e
-                    self.edges.append((u, v))
-                    self.edges.append((v, u))
+               edges = g.live_edges()
+               self.n, self.m = g.n, 2 * len(edges)
+               if storage == "csr" and g.storage == "csr":
+                    self.init_symmetric_csr(g.edges.flat, g.edges_at)
+               elif storage == "csr":
+                    tc = int_typecode(max(self.n, 2 * self.m) + 1)
+                    self.init_symmetric_csr(flat_edges(edges, tc))
+               else:
+                    self.edges = []
                     self.edges_from = [[] for i in range(self.n)]
                     self.edges_to = [[] for i in range(self.n)]
-                    for i in range(self.m):
-                         u, v = self.edges[i]
-                         self.edges_from[u].append(i)
-                         self.edges_to[v].append(i)
+                    for i, (u, v) in enumerate(edges):
+                         self.edges.append((u, v))
+                         self.edges.append((v, u))
+                         self.edges_from[u].append(2 * i)
+                         self.edges_to[v].append(2 * i)
+                         self.edges_from[v].append(2 * i + 1)
+                         self.edges_to[u].append(2 * i + 1)
           else:
                raise ValueError("initialize from unsupported data type.")
+          self.other_end = other_ends(self.edges, int_typecode(2 * self.n))
+          self.weights = None
+          self.min_weight = self.max_weight = None
+          self.cache = None
+          self.reach_index = None
+          if weights is not None:
+               self.set_weights(weights)
           if labels:
                self.labels = labels
           else:
@@ -306,52 +2090,277 @@ class DirectedGraph:
           self.visited_vertices = [False] * self.n
           self.visited_edges = [False] * self.m
           self.order = DirectedGraph.preorder
+          self.version = 0
+          self.removed = 0
+          self.removed_edges = bytearray(self.m)
           
      def __str__(self):
           s = "n, m = %d, %d" % (self.n, self.m)
-          s += "\nedges: %s" % str(add(1, self.edges))
-          s += "\nedges_from: %s" % str(add(1, self.edges_from))
-          s += "\nedges_to: %s" % str(add(1, self.edges_to))
+          s += "\nedges: %s" % str(add(1, as_list(self.edges)))
+          s += "\nedges_from: %s" % str(add(1, as_list(self.edges_from)))
+          s += "\nedges_to: %s" % str(add(1, as_list(self.edges_to)))
           if self.labels:
                s += "\nlabels: %s" % str(self.labels)
           return s
 
-     def dprint(self, args, **kwargs):
-         # debug print function
+     # mutation, in list storage only. see UndirectedGraph.check_mutable.
+     def check_mutable(self):
+          if not self.storage == "list":
+               raise ValueError("graphs in %s storage can not be changed"
+                                % self.storage)
+
+     def check_compacted(self):
+          if self.removed:
+               raise ValueError("graph has %d removed edges, compact() it"
+                                " first" % self.removed)
+
+     def live_edges(self):
+          if not self.removed:
+               return self.edges
+          return [edge for edge in self.edges if edge is not None]
+
+     def add_vertex(self):
+          self.check_mutable()
+          self.edges_from.append([])
+          self.edges_to.append([])
+          self.labels.append(0)
+          self.visited_vertices.append(False)
+          self.n += 1
+          self.version += 1
+          return self.n - 1
+
+     # new edge u -> v with the next free id, which is returned. a graph
+     # with weights needs the weight of the new edge. the weight is
+     # stored first, so a bad one leaves the graph unchanged; a weight
+     # that is not an integer turns the weights into a "d" array.
+     def add_edge(self, u, v, weight=None):
+          self.check_mutable()
+          assert(0 <= u and u < self.n and 0 <= v and v < self.n)
+          if not (weight is None) == (self.weights is None):
+               raise ValueError("give a weight exactly when the graph has"
+                                " weights")
+          if weight is not None:
+               try:
+                    weight = index(weight)
+               except TypeError:
+                    weight = array("d", [weight])[0]
+                    if self.weights.typecode == "q":
+                         self.weights = array("d", self.weights)
+               self.weights.append(weight)
+               self.min_weight = min(self.min_weight, weight)
+               self.max_weight = max(self.max_weight, weight)
+          e = self.m
+          self.edges.append((u, v))
+          self.edges_from[u].append(e)
+          self.edges_to[v].append(e)
+          if u ^ v >= 2**31 and self.other_end.typecode == "i":
+               self.other_end = array("q", self.other_end)
+          self.other_end.append(u ^ v)
+          self.visited_edges.append(False)
+          self.removed_edges.append(False)
+          self.m += 1
+          self.version += 1
+          return e
+
+     def remove_edge(self, e):
+          self.check_mutable()
+          if self.edges[e] is None:
+               raise ValueError("edge %d is already removed" % (e + 1))
+          self.removed_edges[e] = True
+          self.edges[e] = None
+          self.removed += 1
+          self.version += 1
+
+     # drop the tombstones as UndirectedGraph.compact does, weights
+     # included.
+     def compact(self):
+          self.check_mutable()
+          live = [e for e in range(self.m) if self.edges[e] is not None]
+          new_id = array(int_typecode(self.m + 1), [-1]) * self.m
+          for i, e in enumerate(live):
+               new_id[e] = i
+          self.edges = [self.edges[e] for e in live]
+          self.edges_from = [[new_id[e] for e in ids if new_id[e] >= 0]
+                             for ids in self.edges_from]
+          self.edges_to = [[new_id[e] for e in ids if new_id[e] >= 0]
+                           for ids in self.edges_to]
+          self.other_end = array(self.other_end.typecode,
+                                 map(self.other_end.__getitem__, live))
+          if self.weights is not None:
+               self.weights = array(self.weights.typecode,
+                                    map(self.weights.__getitem__, live))
+               self.weight_bounds()
+          self.m = len(live)
+          self.visited_edges = [False] * self.m
+          self.removed_edges = bytearray(self.m)
+          self.removed = 0
+          self.version += 1
+          return new_id
+
+     # bulk construction from an (m, 2) integer array or buffer of edges
+     # in origin `origin` (a flat buffer of 2m verts works too).
+     # the edges are copied into array storage once and the incidence
+     # index is built by sorting, without going through add().
+     @classmethod
+     def from_array(cls, data, n=-1, m=-1, origin=1, labels=[],
+                    debug=False):
+          raw = int_array(data)
+          n, m = check_nm_flat(raw, n, m, origin)
+          flat = shift_array(raw, int_typecode(max(n, 2 * m) + 1), origin)
+          return cls(flat, n, m, labels, debug)
+
+     # construction from an edge list file (text, csv or gzip), streamed
+     # into array storage by read_edge_file. n and m are guessed from the
+     # file when not given, and checked against it when given.
+     @classmethod
+     def from_file(cls, path, n=-1, m=-1, origin=1, labels=[], debug=False,
+                   delimiter=None, comments="#"):
+          flat, n1 = read_edge_file(path, origin, delimiter, comments)
+          if m >= 0 and not m == len(flat) // 2:
+               raise ValueError("number of edges does not match with given m")
+          if 0 <= n < n1:
+               raise ValueError("%s has vertex %d beyond n = %d"
+                                % (path, n1 - 1 + origin, n))
+          return cls(flat, n1 if n < 0 else n, len(flat) // 2, labels, debug)
+
+     # write the graph in the binary format read by load(): the edges,
+     # other_end and the offsets, ids and nbrs arrays of edges_from and
+     # edges_to. list storage is converted to arrays first.
+     def save(self, path):
+          self.check_compacted()
+          g = self
+          if self.storage == "list":
+               tc = int_typecode(max(self.n, 2 * self.m) + 1)
+               g = DirectedGraph(flat_edges(self.edges, tc), self.n, self.m)
+          arrays = [g.edges.flat, g.other_end]
+          for index in (g.edges_from, g.edges_to):
+               arrays += [index.offsets, index.ids, index.nbrs]
+          write_graph_file(path, b"D", g.n, g.m, arrays)
+
+     # graph saved by save(), in csr storage. see UndirectedGraph.load.
+     @classmethod
+     def load(cls, path, debug=False):
+          kind, n, m, arrays = map_graph_file(path)
+          if not kind == b"D":
+               raise ValueError("%s holds an undirected graph" % path)
+          g = cls.__new__(cls)
+          g.debug = debug
+          g.detect_loop = False
+          g.label = 1
+          g.storage = "csr"
+          g.n, g.m = n, m
+          g.edges = EdgeArray(arrays[0])
+          g.other_end = arrays[1]
+          g.edges_from = CSRIndex(*arrays[2:5])
+          g.edges_to = CSRIndex(*arrays[5:8])
+          g.weights = None
+          g.min_weight = g.max_weight = None
+          g.cache = None
+          g.reach_index = None
+          g.labels, g.visited_vertices, g.visited_edges = [], [], []
+          g.order = DirectedGraph.preorder
+          g.version = 0
+          g.removed = 0
+          g.removed_edges = bytearray(m)
+          return g
+
+     # build array-backed edges/edges_from/edges_to from a flat 0 origin
+     # edge array.
+     def init_csr(self, flat):
+          tc = int_typecode(max(self.n, 2 * self.m) + 1)
+          self.edges = EdgeArray(flat)
+          tails, heads = self.edges.tails, self.edges.heads
+          order, offsets = csr_order(self.n, tails, tc)
+          self.edges_from = CSRIndex(offsets, order, gather(heads, order, tc))
+          order, offsets = csr_order(self.n, heads, tc)
+          self.edges_to = CSRIndex(offsets, order, gather(tails, order, tc))
+
+     # build array-backed edges/edges_from/edges_to of the symmetric
+     # digraph of a flat 0 origin undirected edge array (see __init__).
+     # the tails of the arcs are flat itself, so arc j leaves the vert of
+     # incidence j of flat and one sort orders edges_from, with
+     # edges_to following from reverse_arcs. both indexes have the
+     # offsets and nbrs of the undirected edges_at, which are shared
+     # when it is given instead of built again.
+     def init_symmetric_csr(self, flat, edges_at=None):
+          tc = int_typecode(max(self.n, 2 * self.m) + 1)
+          self.edges = EdgeArray(symmetric_arcs(flat, tc))
+          order, offsets = csr_order(self.n, flat, tc)
+          if edges_at is None:
+               nbrs = gather(flat, map_array(xor, order, 1, tc), tc)
+          else:
+               offsets, nbrs = edges_at.offsets, edges_at.nbrs
+          self.edges_from = CSRIndex(offsets, order, nbrs)
+          self.edges_to = CSRIndex(offsets, reverse_arcs(order, flat, nbrs, tc),
+                                   nbrs)
+
+     # incidence index searches follow from a vert.
+     def adjacency(self):
+          return self.edges_from
+
+     # debug print function. the message is formatted as fmt % args
+     # only when debug is on, so disabled calls cost no formatting.
+     def dprint(self, fmt, *args, **kwargs):
          if self.debug:
-              print(args, **kwargs)
-         else:
-              pass
+              if args:
+                   fmt = fmt % args
+              print(fmt, **kwargs)
+
+     # run search(self, self.edges_from, v, *args) from every vert left
+     # unlabeled.
+     def label_notrace(self, search, *args):
+          for v in range(self.n):
+               if self.labels[v] == 0:
+                    search(self, self.edges_from, v, *args)
 
      def depth_search_recursive(self):
           self.init_search_variables()
+          if not self.debug:
+               # recursive labelling is the preorder stack labelling.
+               self.label_notrace(dfs_stack_notrace)
+               return
           for v in self.unlabeled_vertices():
                self.label_vertex(v)
                self.dfs_body(v)
 
-     def dfs_body(self, v):
-          found_unlabeled_vertex = False
-          unvisited_edges = (e for e in self.edges_from[v]
-                             if not self.visited_edges[e])
-          for e in unvisited_edges:
-               self.visited_edges[e] = True
-               v, w = self.edges[e]
-               self.dprint("found non-visited edge e%d with verts"
-                           " (v%d, v%d)" % (e + 1, v + 1, w + 1))
-               if self.labels[w] == 0:
-                    self.label_vertex(w)
-                    found_unlabeled_vertex = True
-                    self.dfs_body(w)
+     # depth first labelling of the verts reachable from s, in the order
+     # the recursive version gave. the recursion is replaced by an
+     # explicit stack of (vertex, edge cursor) pairs kept flat in an
+     # array, so paths of any depth are fine and a frame costs two ints.
+     def dfs_body(self, s):
+          stack = array(int_typecode(max(self.n, 2 * self.m) + 1), (s, 0))
+          while stack:
+               v, i = stack[-2], stack[-1]
+               edges = self.edges_from[v]
+               while i < len(edges):
+                    e = edges[i]
+                    i += 1
+                    if self.visited_edges[e]:
+                         continue
+                    self.visited_edges[e] = True
+                    v, w = self.edges[e]
+                    self.dprint("found non-visited edge e%d with verts"
+                                " (v%d, v%d)", e + 1, v + 1, w + 1)
+                    if self.labels[w] == 0:
+                         self.label_vertex(w)
+                         break # descend into w
+                    else:
+                         self.dprint("v%d is already labeled as %d",
+                                     w + 1, self.labels[w])
                else:
-                    self.dprint("v%d is already labeled as %d" %
-                                (w + 1, self.labels[w]))
-          self.dprint("no more unvisited edges starting from v%d" % (v + 1))
+                    self.dprint("no more unvisited edges starting"
+                                " from v%d", v + 1)
+                    del stack[-2:] # return to the caller
+                    continue
+               stack[-1] = i
+               stack.append(w)
+               stack.append(0)
 
      # generator to obtain next unlabeled vertex.
      def unlabeled_vertices(self):
           for v in range(self.n):
                if self.labels[v] == 0:
-                    self.dprint("found unlabeled vert v%d" % (v + 1))
+                    self.dprint("found unlabeled vert v%d", v + 1)
                     yield v
           # exiting for loop means no unlabeled verts left.
 
@@ -366,216 +2375,463 @@ class DirectedGraph:
      # the stack again.
           for v in range(self.v):
                if not self.visited_vertices[v]:
-                    self.dprint("found unvisited vert v%d" % (v + 1))
+                    self.dprint("found unvisited vert v%d", v + 1)
                     yield v
      
      def push(self, x):
           if self.order == DirectedGraph.preorder:
                self.label_vertex(x)
-          self.dprint("pushing v%d into stack" % (x + 1))
+          self.dprint("pushing v%d into stack", x + 1)
           self.visited_vertices[x] = True
+          self.stack_pos[x] = len(self.stack)
           self.stack.append(x)
-          self.in_stack[x] = True
-          self.dprint("stack = %s" % str_stack(self.stack))
+          if self.debug:
+               self.dprint("stack = %s", str_stack(self.stack))
 
      def pop(self):
           x = self.stack.pop()
           if self.order == DirectedGraph.postorder:
                self.label_vertex(x)
-          self.dprint("popping v%d from stack" % (x + 1))
-          self.dprint("stack = %s" % str_stack(self.stack))
-          self.dprint("labels = %s" % self.labels)
-          self.in_stack[x] = False
+          self.dprint("popping v%d from stack", x + 1)
+          if self.debug:
+               self.dprint("stack = %s", str_stack(self.stack))
+               self.dprint("labels = %s", self.labels)
+          self.stack_pos[x] = -1
           return x
 
      def put(self, x):
           self.label_vertex(x)
-          self.dprint("putting v%d into queue" % (x + 1))
+          self.dprint("putting v%d into queue", x + 1)
           self.visited_vertices[x] = True
-          self.stack.insert(0, x)
+          self.queue.append(x)
           self.in_stack[x] = True
-          self.dprint("queue = %s" % str_stack(self.stack))
+          if self.debug:
+               self.dprint("queue = %s", str_queue(self.queue))
 
      def get(self):
-          x = self.stack.pop()
+          x = self.queue.popleft()
           if self.order == DirectedGraph.postorder:
                self.label_vertex(x)
-          self.dprint("dequeuing v%d from queue" % (x + 1))
-          self.dprint("queue = %s" % str_stack(self.stack))
-          self.dprint("labels = %s" % self.labels)
+          self.dprint("dequeuing v%d from queue", x + 1)
+          if self.debug:
+               self.dprint("queue = %s", str_queue(self.queue))
+               self.dprint("labels = %s", self.labels)
           self.in_stack[x] = False
           return x
      
 
      def label_vertex(self, v):
-          self.dprint("v%d is unlabeled. labeling it as %d"
-                      % (v + 1, self.label))
+          self.dprint("v%d is unlabeled. labeling it as %d",
+                      v + 1, self.label)
           self.labels[v] = self.label
           self.label += 1
                
      def init_search_variables(self):
           self.labels = [0] * self.n
           self.visited_vertices = [False] * self.n
-          self.visited_edges = [False] * self.m
+          if self.removed:
+               self.visited_edges = list(map(bool, self.removed_edges))
+          else:
+               self.visited_edges = [False] * self.m
           self.label = 1
           self.stack = []
+          self.queue = deque()
+          self.cursor = [0] * self.n
           self.in_stack = [False] * self.n
+          # position of each vert in self.stack, -1 when not in it.
+          self.stack_pos = [-1] * self.n
           self.loops = []
 
+     # closed path from w, which is in the stack, to the stack top and
+     # back to w. costs only the length of the path.
      def loop_from(self, w):
-          i = self.stack.index(w)
-          l = self.stack[i:]
-          l.append(l[0])
+          l = self.stack[self.stack_pos[w]:]
+          l.append(w)
           return l
 
+     def closed_path_str(self, w):
+          return loop_str(self.loop_from(w))
+
      def print_loops(self):
-          s = "["
-          for loop in self.loops:
-               s += "<" + " -> ".join(map(str, add(1, loop))) + ">"
-          s += "]"
-          print(s)
+          print("[" + "".join(map(loop_str, self.loops)) + "]")
+
+     # closed paths found by depth first search, yielded one at a time as
+     # they are found. these are the loops depth_search_stack collects
+     # with detect_loop, not every cycle of the graph.
+     def cycles(self):
+          return dfs_cycles(self, self.edges_from)
+
+     # whether the graph has a directed cycle, stopping at the first one.
+     def has_cycle(self):
+          for loop in self.cycles():
+               return True
+          return False
+
+     # generators of the verts in labelling order and of the search
+     # events, yielding as the search goes (see iter_bfs/dfs_events).
+     def iter_breadth_search(self):
+          return iter_bfs(self)
+
+     def iter_depth_search(self):
+          return iter_dfs(self, postorder=self.order == DirectedGraph.postorder)
+
+     def depth_search_events(self):
+          return dfs_events(self)
 
      def depth_search_stack(self):
           self.init_search_variables()
+          if not self.debug:
+               self.label_notrace(
+                    dfs_stack_notrace, self.order == DirectedGraph.postorder)
+               if self.detect_loop:
+                    self.loops = list(self.cycles())
+               return
           for v in self.unlabeled_vertices(): # step 2(a)
                self.push(v)
                self.depth_search_from_stack_top() # step 2 (b)
           self.dprint("all vertices are labelled")
 
+     # strongly connected components (Kosaraju, see scc_ids). returns
+     # comp with comp[v] the component id of v and sets self.components
+     # to their number. ids follow a topological order of the
+     # components: every edge between two components goes from the
+     # smaller id to the larger. unlike the search methods this leaves
+     # the search variables alone.
+     def strongly_connected_components(self):
+          comp, count = scc_ids(self)
+          self.dprint("the graph has %d strongly connected components.",
+                      count)
+          self.components = count
+          return comp
+
+     # condensation of the graph: one vert per strongly connected
+     # component and one edge per pair of components joined by some
+     # edge. returns (dag, comp), dag being a DirectedGraph in array
+     # storage whose vert c is component c of comp.
+     def condensation(self):
+          comp = self.strongly_connected_components()
+          return condense(self, comp, self.components), comp
+
      def depth_search_from_stack_top(self):
           while self.stack:
                # step 2 (b)(i) start
                v = self.stack[-1] # peek stack top
-               self.dprint("stack not empty, top is v%d" % (v + 1))
-               self.dprint("originating search from v%d" % (v + 1))
+               self.dprint("stack not empty, top is v%d", v + 1)
+               self.dprint("originating search from v%d", v + 1)
                # step 2 (b)(i) end
                # step 2 (b)(ii) start
                pushed_new_vert = False
-               unvisited_edges = (e for e in self.edges_from[v]
-                                  if not self.visited_edges[e])
-               for e in unvisited_edges:
+               # resume the scan of v's edges where it stopped the last
+               # time v was on the stack top, so every edge is examined
+               # only once.
+               edges = self.edges_from[v]
+               i = self.cursor[v]
+               while i < len(edges):
+                    e = edges[i]
+                    i += 1
+                    if self.visited_edges[e]:
+                         continue
                     self.visited_edges[e] = True
                     v, w = self.edges[e]
                     self.dprint("found non-visited edge e%d with verts"
-                                " (v%d, v%d)" % (e + 1, v + 1, w + 1))
+                                " (v%d, v%d)", e + 1, v + 1, w + 1)
                     if not self.visited_vertices[w]:
                          self.push(w)
                          pushed_new_vert = True
-                         break # from for loop
+                         break # from edge loop
                     else:
-                         self.dprint("v%d is already labeled as %d" %
-                                     (w + 1, self.labels[w]))
-                         if self.in_stack[w]:
-                              if self.detect_loop:
-                                   self.loops.append(self.loop_from(w))
+                         self.dprint("v%d is already labeled as %d",
+                                     w + 1, self.labels[w])
+                         if self.detect_loop and self.stack_pos[w] >= 0:
+                              self.loops.append(self.loop_from(w))
+               self.cursor[v] = i
                if pushed_new_vert:
                     continue # back to top of while loop
                else:
                     x = self.pop() # dropping v from stack
                self.dprint("no more unvisited edges starting"
-                           " from v%d" % (v + 1))
+                           " from v%d", v + 1)
 
      def find_path_readable(self, s, t):
           print(add(1, self.find_path(s-1, t-1)))
      def find_path(self, s, t):
           # s, t are 1-based indices.
-          assert(0 <= s and s < self.n - 1 and 0 <= t and t < self.n)
+          assert(0 <= s and s < self.n and 0 <= t and t < self.n)
+          # the reachability index and the cache are bypassed when the
+          # search would print. an unreachable t needs no search, and the
+          # stack on reaching t is the dfs tree path to t.
+          quiet = not (self.debug or self.detect_loop)
+          index = self.reach_index
+          if quiet and index is not None and index.version == self.version \
+             and not index.reachable(s, t):
+               return []
+          if quiet and self.cache is not None:
+               if t == s:
+                    return []
+               parent, = self.search_tree("dfs", s)
+               return tree_path(self.edges, parent, s, t)[0]
           self.init_search_variables()
           self.push(s)
           while self.stack:
                # step 2 (b)(i) start
                v = self.stack[-1] # peek stack top
-               self.dprint("stack not empty, top is v%d" % (v + 1))
-               self.dprint("originating search from v%d" % (v + 1))
+               self.dprint("stack not empty, top is v%d", v + 1)
+               self.dprint("originating search from v%d", v + 1)
                # step 2 (b)(i) end
                # step 2 (b)(ii) start
                pushed_new_vert = False
-               unvisited_edges = (e for e in self.edges_from[v]
-                                  if not self.visited_edges[e])
-               for e in unvisited_edges:
+               # resume the scan of v's edges where it stopped the last
+               # time v was on the stack top, so every edge is examined
+               # only once.
+               edges = self.edges_from[v]
+               i = self.cursor[v]
+               while i < len(edges):
+                    e = edges[i]
+                    i += 1
+                    if self.visited_edges[e]:
+                         continue
                     self.visited_edges[e] = True
                     v, w = self.edges[e]
                     self.dprint("found non-visited edge e%d with verts"
-                                " (v%d, v%d)" % (e + 1, v + 1, w + 1))
+                                " (v%d, v%d)", e + 1, v + 1, w + 1)
                     if not self.visited_vertices[w]:
                          self.push(w)
                          pushed_new_vert = True
                          if w == t:
                               return copy.copy(self.stack)
-                         break # from for loop
+                         break # from edge loop
                     else:
-                         self.dprint("v%d is already labeled as %d" %
-                                     (w + 1, self.labels[w]))
-                         if self.detect_loop and w in self.stack:
+                         self.dprint("v%d is already labeled as %d",
+                                     w + 1, self.labels[w])
+                         if self.detect_loop and self.stack_pos[w] >= 0:
                               print("closed path detected (not exhaustive); %s"
                                     % self.closed_path_str(w))
+               self.cursor[v] = i
                if pushed_new_vert:
                     continue # back to top of while loop
                else:
                     x = self.pop() # dropping v from stack
                self.dprint("no more unvisited edges starting"
-                           " from v%d" % (v + 1))
-               return []
+                           " from v%d", v + 1)
+          return []
      def find_shortest_path_readable(self, s, t):
           print(add(1, self.find_shortest_path(s-1, t-1)))
-     def find_shortest_path(self, s, t):
-          assert(0 <= s and s < self.n - 1 and 0 <= t and t < self.n)
-          self.init_search_variables()
-          self.push(s)
-          while self.stack:
-               v = self.stack[-1]
-               self.dprint("queue not empty, top is v%d" % (v + 1))
-               v = self.pop()
-               self.dprint("originating search from v%d" % (v + 1))
-               unvisited_edges = (e for e in self.edges_from[v]
-                                  if not self.visited_edges[e])
-               for e in unvisited_edges:
-                    self.visited_edges[e] = True
-                    v, w = self.edges[e]
-                    self.dprint("found non-visited edge e%d with verts"
-                                " (v%d, v%d)" % (e + 1, v + 1, w + 1))
-                    if not self.visited_vertices[w]:
-                         self.put(w)
-                         put_new_vert = True
-                         if w == t:
-                              print("there is a shortest path from %d to %t" %
-                                    (s + 1, t + 1))
-                    else:
-                         self.dprint("v%d is already labeled as %d" %
-                                     (w + 1, self.labels[w]))
-               self.dprint("no more unvisited edges starting"
-                           " from v%d" % (v + 1))
+     # shortest path s -> t in number of edges (0 origin verts), [] when
+     # there is none. the BFS stops once t is dequeued. with_edges=True
+     # returns (verts, edge ids) instead. bidirectional=True searches
+     # from both ends at once, backward along edges_to.
+     def find_shortest_path(self, s, t, with_edges=False,
+                            bidirectional=False):
+          assert(0 <= s and s < self.n and 0 <= t and t < self.n)
+          if bidirectional:
+               verts, ids, visited = bidirectional_bfs(
+                    self, self.edges_from, self.edges_to, s, t)
+               self.dprint("visited %d verts from both ends", visited)
+               path = verts, ids
+          elif self.cache is not None:
+               parent, dist = self.search_tree("bfs", s)
+               path = tree_path(self.edges, parent, s, t)
+          else:
+               parent, dist = bfs_tree(self, self.edges_from, s, (t,))
+               self.dprint("v%d is at distance %d from v%d",
+                           t + 1, dist[t], s + 1)
+               path = tree_path(self.edges, parent, s, t)
+          return path if with_edges else path[0]
 
+     # verts in topological order, every edge leading from an earlier to
+     # a later vert. CycleError (a ValueError) is raised with a closed
+     # path when the graph is not a DAG. the search variables are left
+     # alone.
+     def topological_order(self):
+          return topological_order(self, self.edges_from)
+
+     # (dist, parent) arrays of the shortest paths from s in a DAG, or
+     # of the longest ones with longest=True, in one pass over the
+     # topological order (see dag_paths). weights is a sequence of edge
+     # lengths indexed by edge id, the weights of the graph (see
+     # set_weights) when None and unit lengths when it has none either.
+     def dag_paths(self, s, weights=None, longest=False):
+          assert(0 <= s and s < self.n)
+          if weights is None:
+               weights = self.weights
+          if weights is not None and not len(weights) == self.m:
+               raise ValueError("number of weights does not match with m")
+          return dag_paths(self, self.edges_from, self.topological_order(),
+                           s, weights, longest)
+
+     # shortest (or longest) path s -> t in a DAG as in find_shortest_path,
+     # [] when there is none.
+     def find_dag_path(self, s, t, weights=None, longest=False,
+                       with_edges=False):
+          assert(0 <= t and t < self.n)
+          dist, parent = self.dag_paths(s, weights, longest)
+          path = tree_path(self.edges, parent, s, t)
+          return path if with_edges else path[0]
+
+     # edge lengths indexed by edge id like edges, kept in an "q" array
+     # when they are all integers and in a "d" array otherwise.
+     # dijkstra() needs them non-negative.
+     def set_weights(self, weights):
+          if not len(weights) == self.m:
+               raise ValueError("number of weights does not match with m")
+          try:
+               self.weights = array("q", weights)
+          except TypeError:
+               self.weights = array("d", weights)
+          self.weight_bounds()
+
+     # min_weight and max_weight are taken once here and kept up to date
+     # by add_edge, so dijkstra() need not scan the weights per call.
+     # the weights of removed edges count until compact().
+     def weight_bounds(self):
+          if len(self.weights):
+               self.min_weight = min(self.weights)
+               self.max_weight = max(self.weights)
+          else:
+               self.min_weight = self.max_weight = 0
+
+     # (dist, parent) arrays of the shortest paths from s under weights,
+     # as dag_paths gives them. with t, the search stops once t is
+     # settled. bucket=True runs dial's bucket queue instead of the heap,
+     # for integer weights whose maximum is small.
+     def dijkstra(self, s, t=None, bucket=False):
+          assert(0 <= s and s < self.n)
+          assert(t is None or 0 <= t and t < self.n)
+          if self.weights is None:
+               raise ValueError("graph has no weights, see set_weights")
+          if self.min_weight < 0:
+               raise ValueError("dijkstra needs non-negative weights")
+          if not bucket:
+               return dijkstra_heap(self, self.edges_from, s, self.weights, t)
+          if not self.weights.typecode == "q":
+               raise ValueError("bucket queue needs integer weights")
+          return dijkstra_bucket(self, self.edges_from, s, self.weights,
+                                 self.max_weight, t)
+
+     # path s -> t of least total weight as in find_shortest_path, []
+     # when there is none.
+     def find_weighted_path(self, s, t, with_edges=False, bucket=False):
+          dist, parent = self.dijkstra(s, t, bucket)
+          path = tree_path(self.edges, parent, s, t)
+          return path if with_edges else path[0]
+
+     # (parent, dist) arrays of a breadth first search from s that scans
+     # edges_to bottom-up on the large middle levels (see
+     # direction_optimizing_bfs). dist is the one of find_shortest_path.
+     def direction_optimizing_bfs(self, s, alpha=14, beta=24, stats=None):
+          assert(0 <= s and s < self.n)
+          return direction_optimizing_bfs(self, self.edges_from, self.edges_to,
+                                          s, alpha, beta, stats)
+
+     # opt-in cache of the search trees behind find_path ("dfs") and
+     # find_shortest_path(s) ("bfs"), keeping the parent (and distance)
+     # arrays of up to max_bytes worth of sources. repeated queries from
+     # a cached source only walk its parent array. the cache is dropped
+     # whenever version changes. unlike the searches, cached queries
+     # leave the search variables alone.
+     def enable_cache(self, max_bytes=64 * 2**20):
+          self.cache = SearchCache(max_bytes)
+
+     def disable_cache(self):
+          self.cache = None
+
+     def search_tree(self, kind, s):
+          tree = self.cache.get((kind, s), self.version)
+          if tree is None:
+               if kind == "bfs":
+                    tree = bfs_tree(self, self.edges_from, s)
+               else:
+                    tree = (dfs_tree(self, self.edges_from, s),)
+               self.cache.put((kind, s), tree)
+          return tree
+
+     # reachability index of the graph (see ReachabilityIndex), built on
+     # first use and again after the graph changed. once built,
+     # find_path answers unreachable pairs from it without a search.
+     def reachability(self):
+          if self.reach_index is None or \
+             not self.reach_index.version == self.version:
+               self.reach_index = ReachabilityIndex(self)
+               self.dprint("reachability index of %d components built in"
+                           " %.3f s, %d bytes", len(self.reach_index.reach),
+                           self.reach_index.build_seconds,
+                           self.reach_index.nbytes)
+          return self.reach_index
+
+     # whether t can be reached from s, a lookup in the reachability
+     # index.
+     def reachable(self, s, t):
+          assert(0 <= s and s < self.n and 0 <= t and t < self.n)
+          return self.reachability().reachable(s, t)
+
+     # some path s -> t as in find_path, found by a depth first search
+     # guided by the reachability index. [] when there is none.
+     def find_guided_path(self, s, t, with_edges=False):
+          assert(0 <= s and s < self.n and 0 <= t and t < self.n)
+          path = self.reachability().path(self, s, t)
+          return path if with_edges else path[0]
+
+     # offsets and nbrs arrays of edges_from, built for list storage.
+     def csr_arrays(self):
+          if self.storage == "csr":
+               return self.edges_from.offsets, self.edges_from.nbrs
+          tc = int_typecode(max(self.n, 2 * self.m) + 1)
+          view = memoryview(flat_edges(self.live_edges(), tc))
+          order, offsets = csr_order(self.n, view[0::2], tc)
+          return offsets, gather(view[1::2], order, tc)
+
+     # BFS distance arrays from each of sources, computed in parallel by
+     # processes worker processes sharing the adjacency (see batch_bfs).
+     # with targets, each result is the list of distances to targets.
+     # unlike the search methods this leaves the search variables alone.
+     def batch_bfs(self, sources, targets=None, processes=None):
+          assert(all(0 <= s and s < self.n for s in sources))
+          offsets, nbrs = self.csr_arrays()
+          return batch_bfs(offsets, nbrs, self.n, sources, targets, processes)
+
+     # shortest paths from s to each vert of targets, from one BFS tree
+     # that is grown only until every target is dequeued.
+     def find_shortest_paths(self, s, targets, with_edges=False):
+          assert(0 <= s and s < self.n)
+          assert(all(0 <= t and t < self.n for t in targets))
+          if self.cache is not None:
+               parent, dist = self.search_tree("bfs", s)
+          else:
+               parent, dist = bfs_tree(self, self.edges_from, s, targets)
+          paths = [tree_path(self.edges, parent, s, t) for t in targets]
+          return paths if with_edges else [path[0] for path in paths]
 
-          
      def breadth_search(self):
           self.init_search_variables()
+          if not self.debug and self.order == DirectedGraph.preorder:
+               self.label_notrace(bfs_notrace)
+               return
           for v in self.unlabeled_vertices(): # step 2(a)
                self.put(v)
                self.breadth_search_from_queue_top() # step 2 (b)
           self.dprint("all vertices are labelled")
                
      def breadth_search_from_queue_top(self):
-          while self.stack:
-               v = self.stack[-1]
-               self.dprint("queue not empty, top is v%d" % (v + 1))
-               v = self.pop()
-               self.dprint("originating search from v%d" % (v + 1))
+          while self.queue:
+               v = self.queue[0]
+               self.dprint("queue not empty, top is v%d", v + 1)
+               v = self.get()
+               self.dprint("originating search from v%d", v + 1)
                unvisited_edges = (e for e in self.edges_from[v]
                                   if not self.visited_edges[e])
                for e in unvisited_edges:
                     self.visited_edges[e] = True
                     v, w = self.edges[e]
                     self.dprint("found non-visited edge e%d with verts"
-                                " (v%d, v%d)" % (e + 1, v + 1, w + 1))
+                                " (v%d, v%d)", e + 1, v + 1, w + 1)
                     if not self.visited_vertices[w]:
                          self.put(w)
                          put_new_vert = True
                     else:
-                         self.dprint("v%d is already labeled as %d" %
-                                     (w + 1, self.labels[w]))
+                         self.dprint("v%d is already labeled as %d",
+                                     w + 1, self.labels[w])
                self.dprint("no more unvisited edges starting"
-                           " from v%d" % (v + 1))
+                           " from v%d", v + 1)
 
                
 if __name__ == '__main__':
@@ -587,6 +2843,13 @@ if __name__ == '__main__':
      # g1.detect_loop = True
      g1.depth_search_stack()
      assert(g1.labels == [1, 2, 6, 5, 4, 3])
+     g1.detect_loop = True
+     g1.depth_search_stack()
+     assert(g1.labels == [1, 2, 6, 5, 4, 3])
+     assert(add(1, g1.loops) == [[1, 2, 6, 5, 4, 1]])
+     assert(list(g1.cycles()) == g1.loops)
+     assert(g1.has_cycle())
+     g1.detect_loop = False
      g1.breadth_search()
      assert(g1.labels == [1, 2, 5, 6, 3, 4])
 
@@ -599,12 +2862,84 @@ if __name__ == '__main__':
      assert(g2.labels == [1, 2, 3, 4, 7, 8, 6, 5, 9, 10])
      g2.depth_search_stack()
      assert(g2.labels == [1, 2, 3, 4, 7, 8, 6, 5, 9, 10])
+     assert(add(1, g2.find_path(0, 6)) == [1, 8, 7])
+     assert(add(1, g2.find_path(0, 9)) == [1, 8, 9, 10])
+     assert(g2.find_path(1, 0) == [])
+     assert(add(1, g2.find_shortest_path(0, 6)) == [1, 8, 7])
+     assert(add(1, g2.find_shortest_path(0, 5, True)) ==
+            ([1, 8, 7, 5, 6], [5, 6, 11, 12]))
+     assert(add(1, g2.find_shortest_paths(0, [5, 9, 3, 0])) ==
+            [[1, 8, 7, 5, 6], [1, 10], [1, 3, 4], [1]])
+     assert(g2.find_shortest_path(1, 0) == [])
+     for s in range(g2.n):
+          for t in range(g2.n):
+               p = g2.find_shortest_path(s, t, True, bidirectional=True)
+               q = g2.find_shortest_path(s, t, True)
+               assert(len(p[0]) == len(q[0]))
+               assert([g2.edges[e] for e in p[1]] ==
+                      list(zip(p[0], p[0][1:])))
      g2.order = DirectedGraph.postorder
      g2.depth_search_stack()
      assert(g2.labels == [10, 3, 2, 1, 5, 4, 6, 9, 8, 7])
      g2.order = DirectedGraph.preorder
      g2.breadth_search()
      assert(g2.labels == [1, 2, 5, 8, 9, 10, 6, 3, 7, 4])
+     assert(list(g2.strongly_connected_components()) ==
+            [0, 2, 2, 2, 1, 1, 1, 0, 0, 0])
+     assert(g2.components == 3)
+     assert(g2.labels == [1, 2, 5, 8, 9, 10, 6, 3, 7, 4])
+     dists = g2.batch_bfs(range(g2.n), processes=2)
+     assert(dists == g2.batch_bfs(range(g2.n), processes=1))
+     assert(all(dists[s][t] == len(g2.find_shortest_path(s, t)) - 1
+                for s in range(g2.n) for t in range(g2.n)))
+     for s in range(g2.n):
+          stats = []
+          parent, dist = g2.direction_optimizing_bfs(s, alpha=1, stats=stats)
+          assert(dist == bfs_tree(g2, g2.edges_from, s)[1])
+          assert(all(dist[g2.edges[parent[v]][0]] == dist[v] - 1
+                     for v in range(g2.n) if parent[v] >= 0))
+          assert(len(stats) == max(dist) + 1)
+     stats = []
+     g2.direction_optimizing_bfs(0, alpha=1, stats=stats)
+     assert([mode for level, mode, size, examined in stats] ==
+            ["top-down"] * 2 + ["bottom-up"] * 3)
+     dag, comp = g2.condensation()
+     assert(add(1, as_list(dag.edges)) == [(1, 2), (1, 3), (2, 3)])
+     assert(list(dag.topological_order()) == [0, 1, 2])
+     try:
+          g2.topological_order()
+          assert(False)
+     except CycleError as error:
+          assert(add(1, error.cycle) == [2, 3, 4, 2])
+     # build steps 1..6 with step durations, critical path 1 3 4 6.
+     e8 = [(1, 2), (1, 3), (2, 4), (3, 4), (4, 6), (2, 5), (5, 6)]
+     w8 = [2, 1, 1, 5, 2, 1, 1]
+     dag = DirectedGraph(e8)
+     order = list(dag.topological_order())
+     assert(all(order.index(u) < order.index(v) for u, v in dag.edges))
+     assert(dag.dag_paths(0, w8)[0] == [0, 2, 1, 3, 3, 4])
+     assert(add(1, dag.find_dag_path(0, 5, w8, longest=True)) == [1, 3, 4, 6])
+     assert(dag.dag_paths(0, w8, longest=True)[0][5] == 8)
+     assert(dag.dag_paths(3)[0] == [None, None, None, 0, None, 1])
+     assert(dag.find_dag_path(5, 0) == [])
+     # weighted shortest paths agree with the DAG pass in both queues.
+     dag.set_weights(w8)
+     for bucket in (False, True):
+          assert(dag.dijkstra(0, bucket=bucket)[0] == dag.dag_paths(0)[0])
+          assert(add(1, dag.find_weighted_path(0, 5, bucket=bucket)) ==
+                 [1, 2, 5, 6])
+          assert(dag.find_weighted_path(5, 0, bucket=bucket) == [])
+     # the DAG pass takes the weights of the graph by default.
+     assert(dag.dag_paths(0)[0] == [0, 2, 1, 3, 3, 4])
+     assert(add(1, dag.find_dag_path(0, 5, longest=True)) == [1, 3, 4, 6])
+     g = DirectedGraph(e2, weights=[0.5] * len(e2))
+     assert(g.dijkstra(0, 6)[0][6] == 1.0)
+     for weights in ([1] * 3, [-1] * len(e2)):
+          try:
+               DirectedGraph(e2, weights=weights).dijkstra(0)
+               assert(False)
+          except ValueError:
+               pass
 
      e3 = [(1, 2), (2, 3), (1, 4), (3, 5), (2, 5), (3, 4), (4, 5)]
      g3 = UndirectedGraph(e3)
@@ -633,4 +2968,267 @@ if __name__ == '__main__':
      g5 = UndirectedGraph(e5)
      g5.depth_search_stack()
      assert(g5.components == 3)
+     assert(list(g5.connected_components()) ==
+            [0] * 6 + [1] * 5 + [2] * 5)
+     cut, bridge, block = g5.biconnected_components()
+     assert(add(1, [v for v in range(g5.n) if cut[v]]) == [2, 7, 14, 15])
+     assert([e for e in range(g5.m) if bridge[e]] == [14, 17])
+     assert(list(block) == [1, 1, 1, 1, 0, 0, 0, 2, 2, 2, 3, 3, 3, 6, 4, 6,
+                            6, 5] and g5.blocks == 7)
+     # a parallel edge is no bridge, a loop is a block of its own.
+     cut, bridge, block = UndirectedGraph([(1, 2), (2, 1), (2, 3), (3, 3)]
+                                          ).biconnected_components()
+     assert(list(cut) == [0, 1, 0] and list(bridge) == [0, 0, 1, 0])
+     assert(list(block) == [2, 2, 1, 0])
+     forest = g5.union_find()
+     assert(not forest.connected(0, 6))
+     forest.add_edge(5, 6)
+     assert(forest.connected(0, 10) and forest.components == 2)
+     assert(add(1, list(g5.cycles())) == [[1, 2, 4, 3, 1], [2, 5, 6, 2],
+                                          [7, 8, 9, 7], [7, 10, 11, 7],
+                                          [12, 14, 15, 12]])
+
+     # array-backed storage visits edges in the same order.
+     for e, cls in ((e1, DirectedGraph), (e2, DirectedGraph),
+                    (e3, UndirectedGraph), (e4, UndirectedGraph)):
+          g, h = cls(e), cls(e, storage="csr")
+          assert(str(g) == str(h))
+          for search in ("depth_search_recursive", "depth_search_stack",
+                         "breadth_search"):
+               getattr(g, search)()
+               getattr(h, search)()
+               assert(g.labels == h.labels)
+     # conversions give the same graph in both storages, and the
+     # symmetric digraph of an undirected graph has arcs 2i and 2i + 1.
+     e7 = e3 + [(2, 2), (1, 2)]
+     arcs = list(chain(*(((u, v), (v, u)) for u, v in e7)))
+     for storage in ("list", "csr"):
+          for g in (UndirectedGraph(e7), UndirectedGraph(e7, storage="csr")):
+               assert(str(DirectedGraph(g, storage=storage)) ==
+                      str(DirectedGraph(arcs)))
+          for g in (DirectedGraph(e7), DirectedGraph(e7, storage="csr")):
+               assert(str(UndirectedGraph(g, storage=storage)) ==
+                      str(UndirectedGraph(e7)))
+     g = DirectedGraph(e2, storage="csr")
+     assert(UndirectedGraph(g, storage="csr").edges.flat is g.edges.flat)
+     h = DirectedGraph.from_array(array("i", chain.from_iterable(e2)))
+     assert(str(h) == str(DirectedGraph(e2)))
+     h = UndirectedGraph.from_array(memoryview(array("q", [0, 1, 1, 2])),
+                                    n=4, origin=0)
+     assert(h.n == 4 and as_list(h.edges_at) == [[0], [0, 1], [1], []])
+     # buffers in either byte order are read in the native one.
+     import ctypes
+     for c in (ctypes.c_int32, ctypes.c_uint16, ctypes.c_int64):
+          for t in (c.__ctype_be__, c.__ctype_le__):
+               h = DirectedGraph.from_array((t * 4)(1, 2, 2, 3))
+               assert(h.n == 3 and as_list(h.edges) == [(0, 1), (1, 2)])
+     # empty (0, 2) buffers give no edges, strided ones are copied.
+     h = DirectedGraph.from_array((ctypes.c_int64 * 2 * 0)())
+     assert(h.n == 0 and h.m == 0)
+     h = DirectedGraph.from_array(memoryview(array("q", [1, 9, 2, 9, 2, 9,
+                                                         3, 9]))[::2])
+     assert(as_list(h.edges) == [(0, 1), (1, 2)])
+     for bad in ([(0, 1)], [(1, 2, 3)]):
+          try:
+               DirectedGraph.from_array(array("q", chain(*bad)))
+               assert(False)
+          except ValueError:
+               pass
+     # saved graphs load with the same edges, indexes and labels.
+     import tempfile
+     with tempfile.TemporaryDirectory() as tmp:
+          path = os.path.join(tmp, "g.graph")
+          for e, cls in ((e2, DirectedGraph), (e4, UndirectedGraph)):
+               for storage in ("list", "csr"):
+                    g = cls(e, storage=storage)
+                    g.save(path)
+                    h = cls.load(path)
+                    assert(str(h) == str(g).split("\nlabels")[0])
+                    h.load(path).save(path + "2")
+                    assert(open(path, "rb").read() ==
+                           open(path + "2", "rb").read())
+                    # saving over the file a loaded graph maps.
+                    h.save(path)
+                    assert(str(cls.load(path)) == str(h))
+                    g.depth_search_stack()
+                    h.depth_search_stack()
+                    assert(g.labels == h.labels)
+          try:
+               DirectedGraph.load(path)
+               assert(False)
+          except ValueError:
+               pass
+          # edge list files in several formats read the same edges.
+          text = "".join("%d %d\n" % e for e in e2)
+          files = {"g.txt": "# e2\n\n" + text,
+                   "g.csv": "source,target\n" + text.replace(" ", ","),
+                   "g.tsv": "".join("%d\t%d\t1.5\n" % e for e in e2)}
+          for name, data in files.items():
+               with open(os.path.join(tmp, name), "w") as f:
+                    f.write(data)
+          with gzip.open(os.path.join(tmp, "g.txt.gz"), "wt") as f:
+               f.write(text)
+          for name in list(files) + ["g.txt.gz"]:
+               name = os.path.join(tmp, name)
+               h = DirectedGraph.from_file(
+                    name, delimiter="," if name.endswith("csv") else None)
+               assert(str(h) == str(DirectedGraph(e2)))
+               flat, n = read_edge_file(name, 0, ",", chunk_size=7)
+               assert(list(flat) == list(chain(*e2)) and n == 11)
+          # extra columns are ignored also next to blank lines, and
+          # lines with one column are refused.
+          name = os.path.join(tmp, "w.txt")
+          with open(name, "w") as f:
+               f.write("1 2 9\n3 4 9\n\n")
+          assert(list(read_edge_file(name)[0]) == [0, 1, 2, 3])
+          with open(name, "w") as f:
+               f.write("1 2 3\n4\n")
+          try:
+               read_edge_file(name)
+               assert(False)
+          except ValueError:
+               pass
+          h = UndirectedGraph.from_file(os.path.join(tmp, "g.txt"), n=12)
+          assert(h.n == 12 and h.m == 19)
+          for kwargs in ({"n": 5}, {"m": 3}, {"origin": 2}):
+               try:
+                    UndirectedGraph.from_file(os.path.join(tmp, "g.txt"),
+                                              **kwargs)
+                    assert(False)
+               except ValueError:
+                    pass
+          g2.save(path)
+          assert(DirectedGraph.load(path).batch_bfs(range(10),
+                                                    processes=2) == dists)
+     # edge updates keep the incidence lists in id order, so searches
+     # label as on a graph built from the remaining edges.
+     g = DirectedGraph(e1, weights=list(range(len(e1))))
+     g.remove_edge(4)
+     w = g.add_vertex()
+     e = g.add_edge(w, 0, 9)
+     assert(g.version == 3 and g.removed == 1 and g.m == 10)
+     g.depth_search_stack()
+     h = DirectedGraph(e1[:4] + e1[5:] + [(7, 1)])
+     h.depth_search_stack()
+     assert(g.labels == h.labels)
+     # removed edges stay in the incidence lists until compact(), and
+     # the methods reading every edge pass them by.
+     assert(4 in g.edges_from[3] and g.find_shortest_path(3, 0) == [])
+     assert(str(UndirectedGraph(g)) == str(UndirectedGraph(h)))
+     assert(g.batch_bfs([3], processes=1) == h.batch_bfs([3], processes=1))
+     try:
+          g.save("g.graph")
+          assert(False)
+     except ValueError:
+          pass
+     assert(list(g.compact()) == [0, 1, 2, 3, -1, 4, 5, 6, 7, 8])
+     assert(str(g) == str(h) and list(g.weights) == [0, 1, 2, 3, 5, 6, 7, 8, 9])
+     assert(g.min_weight == 0 and g.max_weight == 9)
+     g.remove_edge(0)
+     g.add_edge(0, 1, -1)
+     assert(g.min_weight == -1)
+     g.remove_edge(g.m - 1)
+     g.compact()
+     assert(g.min_weight == 1 and g.dijkstra(1, bucket=True)[0][4] == 5)
+     # a bad weight leaves the graph as it was, a fractional one of any
+     # number type widens the weights.
+     m, text = g.m, str(g)
+     try:
+          g.add_edge(0, 2, "3")
+          assert(False)
+     except TypeError:
+          pass
+     assert(g.m == m and str(g) == text)
+     from fractions import Fraction
+     assert(g.add_edge(0, 2, Fraction(3, 2)) == m and g.edges[m] == (0, 2))
+     assert(g.weights.typecode == "d" and g.weights[m] == 1.5)
+     g = UndirectedGraph(e3)
+     g.remove_edge(g.add_edge(2, 2))
+     g.remove_edge(0)
+     g.compact()
+     assert(str(g) == str(UndirectedGraph(e3[1:])))
+     try:
+          DirectedGraph(e1, storage="csr").add_vertex()
+          assert(False)
+     except ValueError:
+          pass
+     # cached queries answer like the searches until the graph changes.
+     g = DirectedGraph(e2)
+     g.enable_cache(max_bytes=200)
+     for k in range(2):
+          assert(add(1, g.find_path(0, 9)) == [1, 8, 9, 10])
+          assert(add(1, g.find_shortest_path(0, 5, True)) ==
+                 ([1, 8, 7, 5, 6], [5, 6, 11, 12]))
+          assert(g.find_path(1, 0) == [] and g.find_path(0, 0) == [])
+     assert(g.cache.hits == 3 and g.cache.misses == 3)
+     g.find_shortest_path(2, 0)
+     assert(g.cache.evictions == 1 and g.cache.nbytes <= 200)
+     g.add_edge(0, 5)
+     assert(add(1, g.find_shortest_path(0, 5)) == [1, 6])
+     assert(g.cache.invalidations == 1)
+     # paths from the last vert, with and without the cache.
+     g = DirectedGraph([(1, 2), (2, 3), (3, 1)])
+     assert(g.find_path(2, 1) == [2, 0, 1])
+     g.enable_cache()
+     assert(g.find_path(2, 1) == [2, 0, 1])
+     # reachability index on the condensation of g2.
+     g = DirectedGraph(e2)
+     assert(g.reachable(0, 5) and not g.reachable(1, 0))
+     assert(len(g.reach_index.reach) == 3 and g.reach_index.nbytes > 0)
+     assert(g.find_path(1, 0) == [])
+     assert(add(1, g.find_guided_path(0, 5)) == [1, 8, 7, 5, 6])
+     g.add_edge(1, 0)
+     assert(g.reachable(1, 0) and g.reach_index.version == g.version)
+     # the index is built apart from the search variables, and needs no
+     # compact() after a removal.
+     g.depth_search_stack()
+     labels = g.labels
+     g.remove_edge(g.m - 1)
+     assert(not g.reachable(1, 0) and g.labels is labels)
+     # paths deeper than the recursion limit.
+     e6 = [(i, i + 1) for i in range(1, 5000)]
+     for cls in (DirectedGraph, UndirectedGraph):
+          g = cls(e6)
+          g.init_search_variables()
+          g.label_vertex(0)
+          g.dfs_body(0)
+          assert(g.labels == list(range(1, 5001)))
+          assert(not g.has_cycle())
+     cut, bridge, block = UndirectedGraph(e6).biconnected_components()
+     assert(cut.count(1) == 4998 and bridge.count(1) == 4999)
+     # reentrant traversals label like the search methods.
+     for g in (g2, g4):
+          g.order = 0
+          g.breadth_search()
+          assert(bfs(g, 0).labels(g.n) == g.labels)
+          g.depth_search_stack()
+          assert(dfs(g, 0).labels(g.n) == g.labels)
+          g.order = 1
+          g.depth_search_stack()
+          assert(dfs(g, 0, postorder=True).labels(g.n) == g.labels)
+          g.order = 0
+     for g in (g1, g2, g3, g4, g5):
+          for order in (0, 1):
+               g.order = order
+               g.depth_search_stack()
+               labels = [0] * g.n
+               for i, v in enumerate(g.iter_depth_search()):
+                    labels[v] = i + 1
+               assert(labels == g.labels)
+          g.order = 0
+          g.breadth_search()
+          assert([g.labels[v] for v in g.iter_breadth_search()] ==
+                 list(range(1, g.n + 1)))
+     events = list(g1.depth_search_events())
+     assert(len([e for e in events if e[0] in ("tree", "back", "nontree")])
+            == g1.m)
+     assert([(v + 1, e + 1) for event, v, e in events if event == "back"] ==
+            [(4, 5)])
+     assert(list(islice(g2.iter_depth_search(), 3)) == [0, 1, 2])
+     r = bfs(g2, 0)
+     assert(add(1, r.path_to(5)[0]) == [1, 8, 7, 5, 6] and r.dist[5] == 4)
+     assert(not dfs(g2, 1).reached(0))
+     h5 = UndirectedGraph(e5, storage="csr")
+     h5.depth_search_stack()
+     assert(h5.components == 3)
      